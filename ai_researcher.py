@@ -1,20 +1,18 @@
 # Step1: Install & Import dependencies
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.prebuilt import create_react_agent
-from arxiv_tool import arxiv_search
-from read_pdf import read_pdf
-from write_pdf import render_latex_pdf
-import os
+from langgraph.prebuilt import ToolNode, create_react_agent
+from research_graph import create_model, get_tools
+import tracing
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Step2: Setup LLM and tools
-tools = [arxiv_search, read_pdf, render_latex_pdf]
-model = ChatGoogleGenerativeAI(model="gemini-2.5-pro", api_key=os.getenv("GEMINI_API_KEY"))
+tools = get_tools()
+model = create_model("gemini-2.5-pro")
 
 # Step3: Create the ReAct agent graph
-graph = create_react_agent(model, tools=tools)
+tool_node = ToolNode(tools, wrap_tool_call=tracing.wrap_tool_call, awrap_tool_call=tracing.awrap_tool_call)
+graph = create_react_agent(model, tools=tool_node)
 
 # Step4: Run the agent with an initial prompt
 
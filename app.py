@@ -1,19 +1,13 @@
 import streamlit as st
-import os
-from typing_extensions import TypedDict
-from typing import Annotated, Literal
-from langgraph.graph.message import add_messages
+import asyncio
+import time
+import uuid
 from dotenv import load_dotenv
-from arxiv_tool import *
-from read_pdf import *
-from write_pdf import *
-from langgraph.prebuilt import ToolNode
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import AIMessage
-from langgraph.graph import END, START, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
-import tempfile
-import base64
+from langchain_core.messages import AIMessageChunk, ToolMessage
+from research_graph import INITIAL_PROMPT, build_graph
+from output_index import output_index, read_bytes
+from jobs import JOB_POLL_SECONDS, CANCELLED, DONE, FAILED, JobQueueFull, JobScheduler
+from tracing import tracer
 
 # Load environment variables
 load_dotenv()
@@ -109,133 +103,24 @@ if 'current_thread_id' not in st.session_state:
     st.session_state.current_thread_id = None
 if 'research_in_progress' not in st.session_state:
     st.session_state.research_in_progress = False
+if 'latencies' not in st.session_state:
+    st.session_state.latencies = []
+if 'job_ids' not in st.session_state:
+    st.session_state.job_ids = []
 
-# Define state
-class State(TypedDict):
-    messages: Annotated[list, add_messages]
-
-# Initialize the graph (only once)
+# Initialize the graph (only once); the Gemini client is created on the
+# first model call, so the page renders without waiting for it
 @st.cache_resource
 def initialize_graph():
-    # Tools and tool node
-    tools = [arxiv_search, read_pdf, render_latex_pdf]
-    tool_node = ToolNode(tools)
-
-    # Setup LLM
-    model = ChatGoogleGenerativeAI(
-        model="gemini-flash-lite-latest", 
-        api_key=os.getenv("GEMINI_API_KEY")
-    )
-    model = model.bind_tools(tools)
-
-    def _unwrap_response(response):
-        """Normalize Gemini responses to a LangChain-standard dict"""
-        role = getattr(response, "role", "assistant")
-        content = getattr(response, "content", None)
-        tool_calls = getattr(response, "tool_calls", None)
-
-        if isinstance(content, list):
-            text = ""
-            for block in content:
-                if isinstance(block, dict) and block.get("text"):
-                    text += block["text"] + "\n"
-            content = text.strip()
-
-        if content is None:
-            content = ""
-
-        msg = {"role": role, "content": content}
-        if tool_calls:
-            msg["tool_calls"] = tool_calls
-
-        return msg
-
-    def call_model(state: State):
-        messages = state.get("messages", [])
-        response = model.invoke(messages)
-        normalized = _unwrap_response(response)
-        new_messages = messages + [normalized]
-        return {"messages": new_messages}
-
-    def should_continue(state: State) -> Literal["tools", END]:
-        messages = state["messages"]
-        last_message = messages[-1]
-        
-        if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-            return "tools"
-        elif isinstance(last_message, dict) and last_message.get("tool_calls"):
-            return "tools"
-        return END
-
-    # Build workflow
-    workflow = StateGraph(State)
-    workflow.add_node("agent", call_model)
-    workflow.add_node("tools", tool_node)
-    workflow.add_edge(START, "agent")
-    workflow.add_conditional_edges(
-        "agent",
-        should_continue,
-        {"tools": "tools", END: END}
-    )
-    workflow.add_edge("tools", "agent")
-
-    checkpointer = MemorySaver()
-    graph = workflow.compile(checkpointer=checkpointer)
-    
-    return graph
+    return build_graph()
 
-# Initialize prompt
-INITIAL_PROMPT = r"""
-You are an expert researcher in the fields of physics, mathematics,
-computer science, quantitative biology, quantitative finance, statistics,
-electrical engineering and systems science, and economics.
 
-You are going to analyze recent research papers in one of these fields in
-order to identify promising new research directions and then write a new
-research paper. For research information or getting papers, ALWAYS use arxiv.org.
-You will use the tools provided to search for papers, read them, and write a new
-paper based on the ideas you find.
-
-RESEARCH WORKFLOW - Follow this sequence intelligently:
-1. **Topic Discovery**: Have a brief conversation to understand the research topic
-2. **Literature Review**: Search arXiv for relevant recent papers on the topic
-3. **Paper Analysis**: Read 1-2 key papers to understand current research
-4. **Idea Generation**: Identify gaps and propose 2-3 specific research directions
-5. **Paper Writing**: Write the research paper with mathematical formulations
-6. **PDF Generation**: Render the final paper as LaTeX PDF
-
-SMART DECISION MAKING RULES:
-- You MAY autonomously proceed through the research workflow steps when the context clearly indicates it's the logical next step
-- You MUST wait for explicit user confirmation before: 
-  * Searching arXiv (but you can suggest specific search queries)
-  * Reading specific PDFs (but you can recommend which papers to read)
-  * Writing the full paper (but you can outline the structure)
-  * Rendering LaTeX (but you can show sample equations)
-- When the user gives a clear directive (e.g., "write the paper", "search for X", "read this"), proceed with that action immediately
-- After completing a major step, briefly summarize what was accomplished and suggest the next logical step
-- If the user provides minimal responses (like "yes", "no", numbers), interpret them in context and proceed logically
-- For mathematical papers, automatically include relevant equations in your discussions
-- When referencing papers, always try to provide arXiv links if available
-
-TOOL USAGE GUIDELINES:
-- Use arxiv_search when you need to find recent papers on a specific topic
-- Use read_pdf when you need to analyze the content of a specific paper
-- Use render_latex_pdf when the paper content is complete and ready for final formatting
-
-CONVERSATION STYLE:
-- Be concise and focused on research progress
-- Minimize unnecessary questions when the intent is clear
-- Provide clear options rather than open-ended questions
-- After user confirms a direction, proceed with the next logical step
-
-CRITICAL CONSTRAINTS:
-- NEVER search or read without user confirmation for the specific action
-- ALWAYS respect the user's explicit instructions
-- NEVER proceed to write the full paper without clear user confirmation
-- ALWAYS ensure mathematical rigor in technical discussions
+# One scheduler for all sessions: agent turns run on its bounded worker pool,
+# so they keep going when the page reruns and never block the script thread
+@st.cache_resource
+def get_scheduler():
+    return JobScheduler()
 
-Now, let's begin our research collaboration. What topic would you like to explore for our paper?
-"""
 
 # Main application
 def main():
@@ -251,6 +136,9 @@ def main():
             st.session_state.messages = []
             st.session_state.current_thread_id = None
             st.session_state.research_in_progress = False
+            st.session_state.latencies = []
+            st.session_state.job_ids = []
+            st.query_params.clear()
             st.rerun()
             
         st.markdown("---")
@@ -281,9 +169,38 @@ def main():
         with col2:
             if st.button("📊 Show Status", use_container_width=True):
                 if st.session_state.research_in_progress:
-                    st.info("🔬 Research in progress...")
+                    waiting = len(st.session_state.job_ids) - 1
+                    st.info("🔬 Research in progress..." + (f" ({waiting} more queued)" if waiting > 0 else ""))
                 else:
                     st.info("✅ Ready to start new research")
+                if st.session_state.latencies:
+                    last = st.session_state.latencies[-1]
+                    first_token = "n/a" if last["first_token"] is None else f'{last["first_token"]:.2f}s'
+                    st.caption(f"⏱️ Last response: first token {first_token}, total {last['total']:.1f}s")
+        
+        # Where the time of this session went, per model and tool
+        if st.session_state.current_thread_id is not None:
+            rows = tracer.session_summary(st.session_state.current_thread_id)
+            if rows:
+                st.markdown("---")
+                st.subheader("⏱️ Session Profile")
+                st.dataframe(
+                    [
+                        {
+                            "step": f'{row["kind"]}: {row["name"]}',
+                            "calls": row["calls"],
+                            "seconds": round(row["seconds"], 2),
+                            "tokens in/out": f'{row["prompt_tokens"]}/{row["completion_tokens"]}',
+                            "KB": round(row["bytes"] / 1024),
+                            "pages": row["pages"],
+                            "cache hits": row["cache_hits"],
+                            "result KB": round(row["result_bytes"] / 1024, 1),
+                        }
+                        for row in rows
+                    ],
+                    hide_index=True,
+                    use_container_width=True,
+                )
         
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -294,6 +211,10 @@ def main():
     except Exception as e:
         st.error(f"❌ Failed to initialize AI agent: {str(e)}")
         st.stop()
+
+    # Resume the session named in the URL (e.g. after a restart or reload)
+    if st.session_state.current_thread_id is None and "thread" in st.query_params:
+        restore_session(graph, st.query_params["thread"])
     
     # Main chat area
     col1, col2 = st.columns([3, 1])
@@ -331,31 +252,38 @@ def main():
                             f'</div>', 
                             unsafe_allow_html=True
                         )
+
+        # Progress of the running/queued turns, polled while there are any
+        if st.session_state.job_ids:
+            job_progress()
     
     with col2:
         st.subheader("📄 Research Output")
         
-        # Check for generated PDF files
-        output_dir = "output"
-        if os.path.exists(output_dir):
-            pdf_files = [f for f in os.listdir(output_dir) if f.endswith('.pdf')]
-            if pdf_files:
-                st.success(f"📚 {len(pdf_files)} PDF(s) generated")
-                for pdf_file in sorted(pdf_files[-3:], reverse=True):  # Show last 3 PDFs, newest first
-                    pdf_path = os.path.join(output_dir, pdf_file)
-                    with open(pdf_path, "rb") as f:
-                        pdf_data = f.read()
-                    b64_pdf = base64.b64encode(pdf_data).decode()
-                    
-                    st.markdown(
-                        f'<div class="pdf-download">'
-                        f'<strong>{pdf_file}</strong><br>'
-                        f'<a href="data:application/pdf;base64,{b64_pdf}" download="{pdf_file}" style="color: #1f77b4; text-decoration: none;">⬇️ Download</a>'
-                        f'</div>',
-                        unsafe_allow_html=True
-                    )
-            else:
-                st.info("📝 No PDFs generated yet")
+        # The index answers from SQLite and only rescans the folder when
+        # it changes; PDF bytes are cached by (path, mtime), so reruns do not
+        # read the files again
+        total = output_index.count()
+        if total:
+            st.success(f"📚 {total} PDF(s) generated")
+            for output in output_index.list(limit=3):  # Show last 3 PDFs, newest first
+                st.markdown(
+                    f'<div class="pdf-download">'
+                    f'<strong>{output["name"]}</strong><br>'
+                    f'{output["size"] / 1024:.0f} KB'
+                    f'</div>',
+                    unsafe_allow_html=True
+                )
+                st.download_button(
+                    "⬇️ Download",
+                    data=read_bytes(output["path"], output["mtime"]),
+                    file_name=output["name"],
+                    mime="application/pdf",
+                    key=f'download_{output["name"]}',
+                    width="stretch",
+                )
+        elif output_index.directory.exists():
+            st.info("📝 No PDFs generated yet")
         else:
             st.info("📁 Output folder will be created when first PDF is generated")
     
@@ -366,56 +294,185 @@ def main():
     if user_input:
         process_message(user_input)
 
+def restore_session(graph, thread_id: str):
+    """Rebuild the chat history of a checkpointed thread"""
+    config = {"configurable": {"thread_id": thread_id}}
+    messages = graph.get_state(config).values.get("messages", [])
+    # Turns still running for this thread (e.g. before a reload) are picked up again
+    jobs = get_scheduler().session_jobs(thread_id)
+    if not messages and not jobs:
+        return
+    st.session_state.current_thread_id = thread_id
+    st.session_state.job_ids = [job.id for job in jobs]
+    st.session_state.research_in_progress = bool(jobs)
+    st.session_state.messages = [
+        {"role": "user" if message.type == "human" else "assistant", "content": message.content}
+        for message in messages
+        if message.type == "human" or (message.type == "ai" and message.content and not message.tool_calls)
+    ]
+
+def _field(message, name):
+    """Read a field from a message object or a message dict"""
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+def _message_text(content) -> str:
+    """Flatten Gemini list content into plain text"""
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return content or ""
+
+async def _stream_turn(graph, input_data, config, job):
+    """Run one turn through ``graph.astream``, reporting progress on ``job``.
+
+    Returns the final assistant text and the time to the first token.
+    """
+    started = time.perf_counter()
+    first_token = None
+    assistant_response = ""
+
+    stream = graph.astream(input_data, config, stream_mode=["messages", "updates"])
+    async for mode, chunk in stream:
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") != "agent" or not isinstance(message, AIMessageChunk):
+                continue
+            text = _message_text(message.content)
+            if not text:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter() - started
+                job.progress(f"⚡ First token after {first_token:.2f}s")
+            job.text += text
+            continue
+
+        for node, update in chunk.items():
+            for message in (update or {}).get("messages", []):
+                if node == "agent":
+                    tool_calls = _field(message, "tool_calls")
+                    for call in tool_calls or []:
+                        job.progress(f"🛠️ Running `{call['name']}`...")
+                    if not tool_calls:
+                        assistant_response = _message_text(_field(message, "content"))
+                    # The next model call starts a fresh message
+                    job.text = ""
+                elif node == "tools":
+                    job.progress(f"✅ `{_field(message, 'name')}` finished")
+
+    return assistant_response, first_token
+
+async def _close_tool_calls(graph, config):
+    """Answer tool calls left open by a cancelled turn, so the thread stays valid"""
+    messages = (await graph.aget_state(config)).values.get("messages", [])
+    if not messages:
+        return
+    answered = {message.tool_call_id for message in messages if message.type == "tool"}
+    pending = [call for call in getattr(messages[-1], "tool_calls", None) or [] if call["id"] not in answered]
+    if pending:
+        await graph.aupdate_state(config, {"messages": [
+            ToolMessage("Cancelled by the user.", tool_call_id=call["id"], name=call["name"], status="error")
+            for call in pending
+        ]}, as_node="tools")
+
+def _turn_job(graph, user_input: str, config):
+    """The job running one conversation turn on the scheduler"""
+    async def run(job):
+        # The thread is checkpointed, so only the new user message is sent
+        # (plus the system prompt on the first turn of the thread); this is
+        # checked when the job starts, after the turns queued before it
+        graph_messages = [{"role": "user", "content": user_input}]
+        if not (await graph.aget_state(config)).values.get("messages"):
+            graph_messages.insert(0, {"role": "system", "content": INITIAL_PROMPT})
+
+        started = time.perf_counter()
+        try:
+            assistant_response, first_token = await _stream_turn(
+                graph, {"messages": graph_messages}, config, job
+            )
+        except asyncio.CancelledError:
+            await _close_tool_calls(graph, config)
+            raise
+        total = time.perf_counter() - started
+        print(f"Response finished in {total:.2f}s, first token after "
+              f"{first_token if first_token is None else round(first_token, 2)}s")
+        return {"response": assistant_response, "first_token": first_token, "total": total}
+
+    return run
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress():
+    """Show the progress of this session's turns and collect finished ones"""
+    scheduler = get_scheduler()
+    jobs = [scheduler.get(job_id) for job_id in st.session_state.job_ids]
+    finished = [job for job in jobs if job is None or job.done]
+
+    for job in jobs:
+        if job is None or job.done:
+            continue
+        if job.started is None:
+            st.info(f"⏳ Queued: {job.label}")
+            continue
+        with st.status(f"🔬 Researching... {job.elapsed:.0f}s", expanded=True):
+            for line in list(job.events):
+                st.write(line)
+        if job.text:
+            st.markdown(
+                f'<div class="assistant-message">'
+                f'<strong>🤖 Assistant:</strong><br>{job.text}▌'
+                f'</div>',
+                unsafe_allow_html=True
+            )
+    if len(finished) < len(jobs) and st.button("⏹️ Cancel", key="cancel_jobs"):
+        scheduler.cancel_session(st.session_state.current_thread_id)
+
+    if not finished:
+        return
+    for job in finished:
+        if job is None:
+            continue
+        if job.status == DONE:
+            st.session_state.latencies.append(
+                {"first_token": job.result["first_token"], "total": job.result["total"]}
+            )
+            if job.result["response"]:
+                st.session_state.messages.append({"role": "assistant", "content": job.result["response"]})
+        elif job.status == FAILED:
+            st.session_state.messages.append(
+                {"role": "assistant", "content": f"❌ Error processing message: {job.error}"}
+            )
+        elif job.status == CANCELLED:
+            st.session_state.messages.append({"role": "assistant", "content": "⏹️ Request cancelled"})
+    st.session_state.job_ids = [job.id for job in jobs if job is not None and not job.done]
+    st.session_state.research_in_progress = bool(st.session_state.job_ids)
+    st.rerun()
+
 def process_message(user_input: str):
-    """Process user message through the graph"""
+    """Queue a user message as a background turn on the scheduler"""
+    # Generate thread ID if not exists; it is kept in the URL so the
+    # session can be resumed from the persistent checkpointer
+    if st.session_state.current_thread_id is None:
+        st.session_state.current_thread_id = uuid.uuid4().hex
+        st.query_params["thread"] = st.session_state.current_thread_id
+
+    config = {"configurable": {"thread_id": st.session_state.current_thread_id}}
     try:
-        # Add user message to session state
-        st.session_state.messages.append({"role": "user", "content": user_input})
-        st.session_state.research_in_progress = True
-        
-        # Generate thread ID if not exists
-        if st.session_state.current_thread_id is None:
-            import random
-            st.session_state.current_thread_id = random.randint(100000, 999999)
-        
-        config = {"configurable": {"thread_id": st.session_state.current_thread_id}}
-        
-        # Prepare messages for graph
-        graph_messages = [{"role": "system", "content": INITIAL_PROMPT}]
-        graph_messages.extend(st.session_state.messages)
-        
-        input_data = {"messages": graph_messages}
-        
-        # Stream the response
-        with st.spinner("🔬 Researching... This may take a moment."):
-            graph = initialize_graph()
-            stream = graph.stream(input_data, config, stream_mode="values")
-            
-            assistant_response = ""
-            for chunk in stream:
-                last_message = chunk["messages"][-1]
-                
-                if isinstance(last_message, dict):
-                    content = last_message.get("content", "")
-                    role = last_message.get("role", "assistant")
-                    
-                    if role == "assistant" and content:
-                        assistant_response = content
-                
-                elif hasattr(last_message, 'content'):
-                    assistant_response = last_message.content
+        job = get_scheduler().submit(
+            st.session_state.current_thread_id,
+            _turn_job(initialize_graph(), user_input, config),
+            label=user_input,
+        )
+    except JobQueueFull as e:
+        st.warning(f"⏳ {e}; wait for them to finish or cancel them")
+        return
 
-        
-        # Add assistant response to session state
-        if assistant_response:
-            st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-        
-        st.session_state.research_in_progress = False
-        st.rerun()
-        
-    except Exception as e:
-        st.error(f"❌ Error processing message: {str(e)}")
-        st.session_state.research_in_progress = False
+    st.session_state.messages.append({"role": "user", "content": user_input})
+    st.session_state.job_ids.append(job.id)
+    st.session_state.research_in_progress = True
+    st.rerun()
 
 # Run the app
 if __name__ == "__main__":
@@ -1,72 +1,294 @@
 # Step1: Access arXiv using URL
-import requests
+import contextvars
+import json
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Literal
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+import tracing
+from disk_cache import DiskCache
+from pdf_cache import parse_arxiv_url
+from prefetch import PDF_PREFETCH_TOP_K
+from ranking import rank_papers
 
+# Parsed search results are cached on disk, keyed by normalized query
+search_cache = DiskCache(
+    "arxiv_search.sqlite",
+    ttl=int(os.getenv("ARXIV_CACHE_TTL", 6 * 60 * 60)),
+    max_entries=int(os.getenv("ARXIV_CACHE_MAX_ENTRIES", 500)),
+)
 
-def search_arxiv_papers(topic: str, max_results: int = 5) -> dict:
+
+# Bump when the shape of parse_arxiv_xml's output changes
+CACHE_SCHEMA = 3
+
+
+def _cache_key(topic: str, max_results: int) -> str:
+    return f"v{CACHE_SCHEMA}|{' '.join(topic.lower().split())}|{max_results}"
+
+
+# Search endpoint; pointed at a local server by the offline benchmarks
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "http://export.arxiv.org/api/query")
+# arXiv returns at most this many entries per request; larger searches are paged
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", 100))
+ARXIV_MAX_RESULTS = int(os.getenv("ARXIV_MAX_RESULTS", 500))
+# arxiv_search fetches this many times more papers than it returns and keeps
+# the most relevant ones (1 disables ranking)
+ARXIV_OVERFETCH = int(os.getenv("ARXIV_OVERFETCH", 4))
+# Abstracts are cut to this many characters in "brief" search results
+ARXIV_BRIEF_SUMMARY_CHARS = int(os.getenv("ARXIV_BRIEF_SUMMARY_CHARS", 300))
+
+
+@dataclass(slots=True)
+class Paper:
+    """One arXiv search result.
+
+    ``id`` is the arXiv ID without its version, ``version`` the version number
+    the feed points at and ``published`` the date of the first version
+    (``YYYY-MM-DD``). The last three fields are filled in by ranking and by
+    batch searches.
+    """
+    id: str
+    version: int | None
+    title: str
+    summary: str
+    authors: list[str]
+    categories: list[str]
+    published: str | None
+    pdf: str | None
+    relevance: float | None = None
+    duplicates: list[str] | None = None
+    matched_queries: list[str] | None = None
+
+    def to_dict(self) -> dict:
+        """Every field that is set (the "full" output mode)."""
+        return {f.name: value for f in fields(self) if (value := getattr(self, f.name)) is not None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Paper":
+        return cls(**{f.name: data.get(f.name) for f in fields(cls)})
+
+    def brief(self, summary_chars: int = ARXIV_BRIEF_SUMMARY_CHARS) -> dict:
+        """ID, title, date, PDF link and the start of the abstract."""
+        summary = self.summary
+        if len(summary) > summary_chars:
+            summary = summary[:summary_chars].rsplit(" ", 1)[0] + "..."
+        data = {"id": self.id, "title": self.title, "published": self.published,
+                "summary": summary, "pdf": self.pdf}
+        if self.matched_queries:
+            data["matched_queries"] = self.matched_queries
+        return data
+
+
+def _build_query(topic: str) -> str:
     query = "+".join(topic.lower().split())
     for char in list('()" '):
         if char in query:
             print(f"Invalid character '{char}' in query: {query}")
             raise ValueError(f"Cannot have character: '{char}' in query: {query}")
-    url = (
-            "http://export.arxiv.org/api/query"
+    return query
+
+
+def _query_url(query: str, start: int, count: int) -> str:
+    return (
+            f"{ARXIV_API_URL}"
             f"?search_query=all:{query}"
-            f"&max_results={max_results}"
+            f"&start={start}"
+            f"&max_results={count}"
             "&sortBy=submittedDate"
             "&sortOrder=descending"
         )
-    print(f"Making request to arXiv API: {url}")
-    resp = requests.get(url)
-    
-    if not resp.ok:
-        print(f"ArXiv API request failed: {resp.status_code} - {resp.text}")
-        raise ValueError(f"Bad response from arXiv API: {resp}\n{resp.text}")
-    
-    data = parse_arxiv_xml(resp.text)
+
+
+def iter_arxiv_papers(topic: str, max_results: int | None = None, start: int = 0,
+                      page_size: int = ARXIV_PAGE_SIZE):
+    """Lazily yield search results, fetching one page at a time.
+
+    Each page is streamed and parsed as it downloads, so the first entries are
+    available before the page is complete. Stopping the iteration early closes
+    the connection and never requests the following pages.
+
+    Args:
+        topic: The topic to search for papers about
+        max_results: Stop after this many entries (``None`` for all of them)
+        start: Offset of the first result
+        page_size: Entries requested per API call
+    """
+    query = _build_query(topic)
+    fetched = 0
+    while max_results is None or fetched < max_results:
+        count = page_size if max_results is None else min(page_size, max_results - fetched)
+        url = _query_url(query, start + fetched, count)
+        print(f"Making request to arXiv API: {url}")
+        resp = http_client.get(url, stream=True)
+
+        if not resp.ok:
+            print(f"ArXiv API request failed: {resp.status_code} - {resp.text}")
+            raise ValueError(f"Bad response from arXiv API: {resp}\n{resp.text}")
+
+        received = 0
+        try:
+            resp.raw.decode_content = True
+            for entry in iter_arxiv_entries(resp.raw):
+                received += 1
+                yield entry
+        finally:
+            resp.close()
+
+        fetched += received
+        if received < count:
+            break
+
+
+def search_arxiv_papers(topic: str, max_results: int = 5) -> dict:
+    key = _cache_key(topic, max_results)
+    cached = search_cache.get(key)
+    if cached is not None:
+        print(f"arXiv cache hit for: {key}")
+        tracing.add(cache_hits=1)
+        return {"entries": [Paper.from_dict(entry) for entry in cached["entries"]]}
+    tracing.add(cache_misses=1)
+
+    data = {"entries": list(iter_arxiv_papers(topic, max_results))}
+    search_cache.set(key, {"entries": [paper.to_dict() for paper in data["entries"]]})
+    return data
+
+
+async def asearch_arxiv_papers(topic: str, max_results: int = 5) -> dict:
+    """Async version of ``search_arxiv_papers``; pages are awaited, not blocked on."""
+    key = _cache_key(topic, max_results)
+    cached = search_cache.get(key)
+    if cached is not None:
+        print(f"arXiv cache hit for: {key}")
+        tracing.add(cache_hits=1)
+        return {"entries": [Paper.from_dict(entry) for entry in cached["entries"]]}
+    tracing.add(cache_misses=1)
+
+    query = _build_query(topic)
+    entries = []
+    while len(entries) < max_results:
+        count = min(ARXIV_PAGE_SIZE, max_results - len(entries))
+        url = _query_url(query, len(entries), count)
+        print(f"Making request to arXiv API: {url}")
+        resp = await http_client.aget(url)
+
+        if not resp.is_success:
+            print(f"ArXiv API request failed: {resp.status_code} - {resp.text}")
+            raise ValueError(f"Bad response from arXiv API: {resp}\n{resp.text}")
+
+        page = list(iter_arxiv_entries(io.BytesIO(resp.content)))
+        entries.extend(page)
+        if len(page) < count:
+            break
+
+    data = {"entries": entries}
+    search_cache.set(key, {"entries": [paper.to_dict() for paper in entries]})
     return data
 
 
 # Step2: Parse XML
+import io
 import xml.etree.ElementTree as ET
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+def _parse_entry(entry) -> Paper:
+    # Extract authors
+    authors = [author.findtext(f"{ATOM}name") for author in entry.iter(f"{ATOM}author")]
+
+    # Extract categories (term attribute)
+    categories = [cat.attrib.get("term") for cat in entry.iter(f"{ATOM}category")]
+
+    # Extract PDF link (rel="related" and type="application/pdf")
+    pdf_link = None
+    for link in entry.iter(f"{ATOM}link"):
+        if link.attrib.get("type") == "application/pdf":
+            pdf_link = link.attrib.get("href")
+            break
+
+    abs_url = entry.findtext(f"{ATOM}id") or ""
+    parsed = parse_arxiv_url(abs_url)
+    version = parsed[1] if parsed else None
+    published = entry.findtext(f"{ATOM}published")
+
+    # Titles and abstracts are wrapped in the feed; the line breaks only cost tokens
+    return Paper(
+        id=parsed[0] if parsed else abs_url,
+        version=int(version[1:]) if version else None,
+        title=" ".join((entry.findtext(f"{ATOM}title") or "").split()),
+        summary=" ".join((entry.findtext(f"{ATOM}summary") or "").split()),
+        authors=authors,
+        categories=categories,
+        published=published[:10] if published else None,
+        pdf=pdf_link,
+    )
+
+
+def iter_arxiv_entries(source):
+    """Incrementally parse an arXiv Atom feed, yielding one entry at a time.
+
+    Args:
+        source: A binary file-like object (e.g. a streamed response body)
+
+    Each ``<entry>`` is released as soon as it has been converted, so memory
+    stays flat however many results the feed holds.
+    """
+    root = None
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if root is None:
+            root = elem
+        elif event == "end" and elem.tag == f"{ATOM}entry":
+            yield _parse_entry(elem)
+            root.clear()
+
+
 def parse_arxiv_xml(xml_content: str) -> dict:
-    """Parse the XML content from arXiv API response."""
+    """Parse the XML content from arXiv API response into ``{"entries": [Paper, ...]}``."""
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode("utf-8")
+    return {"entries": list(iter_arxiv_entries(io.BytesIO(xml_content)))}
 
-    entries = []
-    ns = {
-        "atom": "http://www.w3.org/2005/Atom",
-        "arxiv": "http://arxiv.org/schemas/atom"
-    }
-    root = ET.fromstring(xml_content)
-    # Loop through each <entry> in Atom namespace
-    for entry in root.findall("atom:entry", ns):
-        # Extract authors
-        authors = [
-            author.findtext("atom:name", namespaces=ns)
-            for author in entry.findall("atom:author", ns)
-        ]
-        
-        # Extract categories (term attribute)
-        categories = [
-            cat.attrib.get("term")
-            for cat in entry.findall("atom:category", ns)
-        ]
-        
-        # Extract PDF link (rel="related" and type="application/pdf")
-        pdf_link = None
-        for link in entry.findall("atom:link", ns):
-            if link.attrib.get("type") == "application/pdf":
-                pdf_link = link.attrib.get("href")
-                break
-
-        entries.append({
-            "title": entry.findtext("atom:title", namespaces=ns),
-            "summary": entry.findtext("atom:summary", namespaces=ns).strip(),
-            "authors": authors,
-            "categories": categories,
-            "pdf": pdf_link
-        })
-
-    return {"entries": entries}
+
+def search_arxiv_batch(topics: list[str], max_results: int = 5) -> dict:
+    """Run several searches concurrently and merge the results.
+
+    Requests still go through the arXiv rate limit, but cache hits and XML
+    parsing overlap with the waiting. Papers found by more than one query are
+    returned once, with every query that matched them in ``matched_queries``.
+    """
+    # "GNN" and " gnn" are the same query; keep the first spelling
+    unique = {}
+    for topic in topics:
+        if topic.strip():
+            unique.setdefault(" ".join(topic.lower().split()), topic.strip())
+    topics = list(unique.values())
+    merged = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(topics), 4))) as pool:
+        # Each worker runs in a copy of the caller's context so traced
+        # counters (bytes, cache hits) land on the calling tool step
+        futures = {
+            topic: pool.submit(contextvars.copy_context().run, search_arxiv_papers, topic, max_results)
+            for topic in topics
+        }
+        for topic, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[topic] = str(e)
+                continue
+            for entry in result["entries"]:
+                paper = merged.get(entry.id)
+                if paper is None:
+                    paper = merged[entry.id] = replace(entry, matched_queries=[])
+                paper.matched_queries.append(topic)
+
+    data = {"entries": list(merged.values())}
+    if errors:
+        data["errors"] = errors
+    return data
 
 
 
@@ -74,21 +296,101 @@ def parse_arxiv_xml(xml_content: str) -> dict:
 from langchain_core.tools import tool
 
 
+def _rank(topic: str, max_results: int, fetched: dict) -> dict:
+    if ARXIV_OVERFETCH <= 1:
+        return fetched
+    papers = {"entries": rank_papers(topic, fetched["entries"], max_results)}
+    print(f"Ranked {len(fetched['entries'])} papers, keeping {len(papers['entries'])}")
+    return papers
+
+
+def _fetch_count(max_results: int) -> int:
+    return min(max_results * max(ARXIV_OVERFETCH, 1), ARXIV_MAX_RESULTS)
+
+
+def _prefetch(papers: dict):
+    # The agent usually reads one of the top results next; start on them now
+    if PDF_PREFETCH_TOP_K > 0:
+        from read_pdf import prefetcher
+        prefetcher.prefetch(paper.pdf for paper in papers["entries"] if paper.pdf)
+
+
+def _result(papers: dict, mode: str) -> dict:
+    """The tool result sent to the model, in "brief" or "full" mode."""
+    result = dict(papers, entries=[
+        paper.brief() if mode == "brief" else paper.to_dict() for paper in papers["entries"]
+    ])
+    print(f"Returning {len(result['entries'])} papers in {mode} mode "
+          f"({len(json.dumps(result, ensure_ascii=False))} characters)")
+    return result
+
+
 @tool
-def arxiv_search(topic: str) -> list[dict]:
-    """Search for recently uploaded arXiv papers
+def arxiv_search(topic: str, max_results: int = 5, mode: Literal["brief", "full"] = "brief") -> dict:
+    """Search recently uploaded arXiv papers, ranked by relevance to the topic
+
+    A larger batch of the newest matching papers is fetched, ranked by how
+    well they match the topic, and near-duplicates (papers with nearly the
+    same title and abstract) are folded into one entry; "full" mode lists
+    their IDs under "duplicates".
 
     Args:
         topic: The topic to search for papers about
+        max_results: How many of the most relevant papers to return
+        mode: "brief" for the ID, title, date, PDF link and the start of the
+            abstract; "full" to also get the complete abstract, authors and
+            categories
 
     Returns:
-        List of papers with their metadata including title, authors, summary, etc.
+        Papers with their metadata
     """
     print("ARXIV Agent called")
     print(f"Searching arXiv for papers about: {topic}")
-    papers = search_arxiv_papers(topic)
-    if len(papers) == 0:
+    max_results = min(max_results, ARXIV_MAX_RESULTS)
+    papers = _rank(topic, max_results, search_arxiv_papers(topic, _fetch_count(max_results)))
+    if not papers["entries"]:
         print(f"No papers found for topic: {topic}")
         raise ValueError(f"No papers found for topic: {topic}")
     print(f"Found {len(papers['entries'])} papers about {topic}")
-    return papers
\ No newline at end of file
+    _prefetch(papers)
+    return _result(papers, mode)
+
+
+async def aarxiv_search(topic: str, max_results: int = 5, mode: Literal["brief", "full"] = "brief") -> dict:
+    print(f"Searching arXiv (async) for papers about: {topic}")
+    max_results = min(max_results, ARXIV_MAX_RESULTS)
+    fetched = await asearch_arxiv_papers(topic, _fetch_count(max_results))
+    papers = _rank(topic, max_results, fetched)
+    if not papers["entries"]:
+        print(f"No papers found for topic: {topic}")
+        raise ValueError(f"No papers found for topic: {topic}")
+    print(f"Found {len(papers['entries'])} papers about {topic}")
+    _prefetch(papers)
+    return _result(papers, mode)
+
+
+arxiv_search.coroutine = aarxiv_search
+
+
+@tool
+def arxiv_batch_search(topics: list[str], mode: Literal["brief", "full"] = "brief") -> dict:
+    """Search arXiv for several related topics in one call
+
+    Prefer this over calling arxiv_search repeatedly. Papers matching more
+    than one topic are listed once.
+
+    Args:
+        topics: The topics to search for papers about
+        mode: "brief" or "full", as for arxiv_search
+
+    Returns:
+        Papers with their metadata plus the list of topics that matched each one
+    """
+    print(f"Searching arXiv for {len(topics)} topics: {topics}")
+    papers = search_arxiv_batch(topics)
+    if not papers["entries"]:
+        print(f"No papers found for topics: {topics}")
+        raise ValueError(f"No papers found for topics: {topics}")
+    print(f"Found {len(papers['entries'])} unique papers across {len(topics)} topics")
+    _prefetch(papers)
+    return _result(papers, mode)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Compare sequential and concurrent ``read_pdf`` calls in one agent turn.
+
+Usage:
+    python benchmarks/bench_async_tools.py paper.pdf [--reads 4] [--latency 0.5]
+
+A turn in which the model asks for several papers at once is simulated by
+serving ``paper.pdf`` from a local HTTP server that waits ``--latency`` seconds
+before every response. ``sequential`` runs the tool calls one after the other
+through the sync tool (the old ``graph.stream`` path); ``async`` gathers the
+async tool variants as ``ToolNode`` does under ``graph.astream``. Every mode uses
+its own URLs and a temporary cache directory, so all reads are cache misses.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("AI_RESEARCHER_CACHE_DIR", tempfile.mkdtemp(prefix="bench_async_"))
+
+import read_pdf  # noqa: E402
+
+
+def serve(pdf_data: bytes, latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(pdf_data)))
+            self.end_headers()
+            self.wfile.write(pdf_data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_sequential(urls):
+    for url in urls:
+        read_pdf.read_pdf.invoke({"url": url})
+
+
+async def run_async(urls):
+    await asyncio.gather(*(read_pdf.read_pdf.ainvoke({"url": url}) for url in urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdf", help="Local PDF file to serve")
+    parser.add_argument("--reads", type=int, default=4, help="read_pdf calls per turn")
+    parser.add_argument("--latency", type=float, default=0.5, help="Server delay in seconds")
+    args = parser.parse_args()
+
+    server = serve(Path(args.pdf).read_bytes(), args.latency)
+    base = f"http://127.0.0.1:{server.server_port}"
+    timings = {}
+    for mode in ("sequential", "async"):
+        urls = [f"{base}/{mode}/{i}.pdf" for i in range(args.reads)]
+        start = time.perf_counter()
+        if mode == "sequential":
+            run_sequential(urls)
+        else:
+            asyncio.run(run_async(urls))
+        timings[mode] = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"{'mode':<12} {'reads':>5} {'total s':>8}")
+    for mode, elapsed in timings.items():
+        print(f"{mode:<12} {args.reads:>5} {elapsed:>8.3f}")
+    print(f"speedup: {timings['sequential'] / timings['async']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure cold import time of the entry modules with ``python -X importtime``.
+
+Usage:
+    python benchmarks/bench_import_time.py [--repeat 3] [--max-ms 1500]
+
+Each module is imported in a fresh interpreter ``--repeat`` times and the best
+cumulative import time is reported together with its slowest dependencies.
+The script exits with status 1 if a module is slower than ``--max-ms`` or if a
+dependency that should only load on first use (the Gemini client, the PDF
+extraction engines, numpy) is imported eagerly, so it can run as a regression
+check in CI.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = ["arxiv_tool", "read_pdf", "write_pdf", "library", "research_graph"]
+# Imported only when the model is first called or a tool first needs them
+LAZY = ["langchain_google_genai", "pypdf", "PyPDF2", "pdfminer", "numpy"]
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str, cache_dir: str):
+    """``(cumulative µs, [(µs, name), ...] of direct dependencies, loaded lazy modules)``."""
+    code = f"import sys, {module}; print(' '.join(m for m in {LAZY!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "AI_RESEARCHER_CACHE_DIR": cache_dir},
+    )
+    total = 0
+    deps = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if name == module and depth == 1:
+            total = cumulative
+        elif depth == 3:
+            deps.append((cumulative, name))
+    return total, sorted(deps, reverse=True), result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail if any module takes longer than this to import")
+    parser.add_argument("--top", type=int, default=3, help="Slowest dependencies to show")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f"{'module':<16} {'best ms':>8}  slowest dependencies")
+        for module in args.modules:
+            runs = [import_profile(module, cache_dir) for _ in range(args.repeat)]
+            total, deps, eager = min(runs, key=lambda run: run[0])
+            slowest = ", ".join(f"{name} {us / 1000:.0f}ms" for us, name in deps[:args.top])
+            print(f"{module:<16} {total / 1000:>8.1f}  {slowest}")
+            if args.max_ms is not None and total / 1000 > args.max_ms:
+                print(f"  FAIL: slower than {args.max_ms:.0f}ms")
+                failed = True
+            if eager:
+                print(f"  FAIL: imports {', '.join(eager)} eagerly")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Compare the PDF text extraction backends on a corpus of PDFs.
+
+Usage:
+    python benchmarks/bench_pdf_backends.py paper.pdf corpus_dir/ [--backends pypdf,pdfminer]
+        [--repeat 3]
+
+Every backend extracts every page of every PDF (directories are searched for
+``*.pdf``). For each backend the script reports throughput (pages per second,
+best of ``--repeat`` runs), peak Python memory (tracemalloc, first run, engine
+import excluded) and text-quality proxies:
+
+* ``clean``: share of tokens that look like ordinary words
+* ``long``: share of alphabetic tokens over 15 letters, usually words glued
+  together because spaces were lost
+* ``F1`` / ``order``: when a reference ``<name>.txt`` sits next to
+  ``<name>.pdf``, word-level F1 against it and a sequence-similarity score that
+  drops when columns are interleaved
+
+Without arguments a small synthetic corpus with known text is used, which is
+only good as a smoke test; benchmark real arXiv PDFs to choose ``PDF_BACKEND``.
+Backends whose package is not installed are skipped.
+"""
+import argparse
+import logging
+import re
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from difflib import SequenceMatcher
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_backends import BACKENDS  # noqa: E402
+
+CLEAN_RE = re.compile(r"^[(\[\"']?[A-Za-z]+(?:[-'][A-Za-z]+)*[)\]\"'.,;:!?]*$")
+WORD_RE = re.compile(r"[a-z0-9]+")
+# Words compared for the order score; SequenceMatcher is quadratic
+ORDER_WORDS = 3000
+
+
+def load_corpus(paths: list[str]) -> list[tuple[str, bytes, str | None]]:
+    """``(name, pdf_bytes, reference_text)`` for every PDF under ``paths``."""
+    corpus = []
+    for path in map(Path, paths):
+        files = sorted(path.glob("*.pdf")) if path.is_dir() else [path]
+        for pdf in files:
+            reference = pdf.with_suffix(".txt")
+            corpus.append((pdf.name, pdf.read_bytes(),
+                           reference.read_text() if reference.exists() else None))
+    return corpus
+
+
+def synthetic_corpus() -> list[tuple[str, bytes, str | None]]:
+    from bench_research_loop import make_pdf
+
+    words = ("spectral graph convolution attention transformer kernel estimator regret "
+             "bound convergence manifold diffusion sparse").split()
+    corpus = []
+    for n in range(3):
+        pages = []
+        for i in range(8):
+            # make_pdf breaks lines every 90 characters; pad lines so no word is split
+            lines = [" ".join(words[(i * 7 + k + line + n) % len(words)] for k in range(8))
+                     for line in range(40)]
+            pages.append("".join(line.ljust(90) for line in lines))
+        corpus.append((f"synthetic_{n}.pdf", make_pdf(pages), "\n".join(pages)))
+    return corpus
+
+
+def extract(backend, pdf_data: bytes) -> list[str]:
+    document = backend.open(pdf_data)
+    return [backend.page_text(document, i) for i in range(backend.page_count(document))]
+
+
+def quality(text: str, reference: str | None) -> dict:
+    tokens = text.split()
+    alphabetic = [t for t in tokens if t.isalpha()]
+    scores = {
+        "clean": sum(bool(CLEAN_RE.match(t)) for t in tokens) / max(len(tokens), 1),
+        "long": sum(len(t) > 15 for t in alphabetic) / max(len(alphabetic), 1),
+    }
+    if reference is not None:
+        got, want = WORD_RE.findall(text.lower()), WORD_RE.findall(reference.lower())
+        overlap = sum((Counter(got) & Counter(want)).values())
+        precision, recall = overlap / max(len(got), 1), overlap / max(len(want), 1)
+        scores["f1"] = 2 * precision * recall / (precision + recall) if overlap else 0.0
+        scores["order"] = SequenceMatcher(None, got[:ORDER_WORDS], want[:ORDER_WORDS], autojunk=False).ratio()
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="PDF files or directories of PDFs")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    # The engines log a warning for every odd font or object; only results matter here
+    logging.disable(logging.WARNING)
+
+    corpus = load_corpus(args.paths) if args.paths else synthetic_corpus()
+    if not corpus:
+        sys.exit(f"No PDFs found in {', '.join(args.paths)}")
+    print(f"{len(corpus)} PDFs{'' if args.paths else ' (synthetic)'}\n")
+    print(f"{'backend':<10} {'pages':>6} {'pages/s':>8} {'peak MB':>8} {'chars/pg':>8} "
+          f"{'clean':>6} {'long':>6} {'F1':>6} {'order':>6}")
+    for name in args.backends.split(","):
+        backend = BACKENDS[name]
+        if not backend.available():
+            print(f"{name:<10} skipped: pip install {backend.package}")
+            continue
+        # Import the engine, including the modules it loads on the first page,
+        # so the peak memory below is the extraction's only
+        document = backend.open(corpus[0][1])
+        if backend.page_count(document):
+            backend.page_text(document, 0)
+        pages = chars = 0
+        seconds = peak = 0.0
+        scores = []
+        for _, data, reference in corpus:
+            tracemalloc.start()
+            text = extract(backend, data)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                extract(backend, data)
+                best = min(best, time.perf_counter() - started)
+            pages += len(text)
+            chars += sum(map(len, text))
+            seconds += best
+            scores.append(quality("\n".join(text), reference))
+
+        def mean(key):
+            values = [s[key] for s in scores if key in s]
+            return f"{sum(values) / len(values):.3f}" if values else "-"
+
+        print(f"{name:<10} {pages:>6} {pages / seconds:>8.1f} {peak / 1e6:>8.1f} {chars / max(pages, 1):>8.0f} "
+              f"{mean('clean'):>6} {mean('long'):>6} {mean('f1'):>6} {mean('order'):>6}")
+
+
+if __name__ == "__main__":
+    main()
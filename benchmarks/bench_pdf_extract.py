@@ -0,0 +1,50 @@
+"""Compare serial and process-pool text extraction for ``read_pdf``.
+
+Usage:
+    python benchmarks/bench_pdf_extract.py paper.pdf [more.pdf ...] [--workers 1,2,4,8]
+
+Each PDF is extracted once per worker count (``1`` is the serial path) and the
+best of ``--repeat`` runs is reported together with the speedup over serial.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import read_pdf  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="+", help="Local PDF files to extract")
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count() or 1}")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    worker_counts = sorted({int(w) for w in args.workers.split(",")})
+    # Benchmark the parallel path even on short documents
+    read_pdf.PARALLEL_MIN_PAGES = 1
+
+    print(f"{'file':<30} {'workers':>7} {'best s':>8} {'speedup':>8}")
+    for pdf in args.pdfs:
+        data = Path(pdf).read_bytes()
+        serial = None
+        for workers in worker_counts:
+            # Warm the pool so process start-up is not counted
+            read_pdf.extract_text(data, workers=workers)
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                read_pdf.extract_text(data, workers=workers)
+                best = min(best, time.perf_counter() - start)
+            if workers == 1:
+                serial = best
+            speedup = f"{serial / best:.2f}x" if serial else "-"
+            print(f"{Path(pdf).name:<30} {workers:>7} {best:>8.3f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Run the research loop end to end without Gemini, arXiv or a TeX install.
+
+Usage:
+    python benchmarks/bench_research_loop.py [--scenario search-read-write]
+        [--turns 2] [--async] [--model-latency 1.5] [--fixtures DIR]
+        [--real-tectonic]
+
+The graph from ``research_graph.build_graph`` (the one used by
+``ai_researcher2.py`` and ``app.py``) is driven by a scripted chat model that
+issues deterministic tool calls. Network access goes to a local HTTP server
+that answers arXiv API queries with an Atom feed and serves PDFs, and
+``tectonic`` is replaced by a stub unless ``--real-tectonic`` is given.
+
+Scenarios (each is one user turn, repeated ``--turns`` times on one thread):
+
+* ``search``: arxiv_search, then answer
+* ``search-read``: arxiv_search, read the top 3 papers concurrently, answer
+* ``search-read-write``: as above, then render a LaTeX paper, answer
+
+``--fixtures DIR`` replays recorded data instead of synthetic papers: ``DIR``
+holds an arXiv API response saved as ``feed.xml`` and any number of ``*.pdf``
+files, which are served in place of the PDFs the feed links to.
+
+For every turn the script prints each model/tool step with its latency, bytes
+downloaded, pages extracted, cache hits and result size, followed by the turn's wall time,
+peak Python memory (tracemalloc) and the size of the checkpointed state.
+"""
+import argparse
+import asyncio
+import os
+import pickle
+import re
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SCENARIOS = {
+    "search": ["search"],
+    "search-read": ["search", "read"],
+    "search-read-write": ["search", "read", "write"],
+}
+PAPER = r"""\documentclass{article}
+\usepackage{amsmath}
+\begin{document}
+\section{Introduction}
+We study $f(x) = \sum_{i=1}^{n} w_i x_i$ and show
+\begin{align} \mathcal{L}(w) &= \frac{1}{n} \sum_i (y_i - f(x_i))^2 \end{align}
+\end{document}
+"""
+STUB_TECTONIC = """#!/bin/sh
+if [ "$1" = "--version" ]; then echo "tectonic-stub 0.0.0"; exit 0; fi
+sleep 0.3
+printf '%%PDF-1.4\\n%%%%EOF\\n' > "$3/$(basename "$1" .tex).pdf"
+"""
+
+
+def make_pdf(pages: list[str]) -> bytes:
+    """A minimal valid PDF with one text page per string."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = [text[i:i + 90].replace("\\", "").replace("(", "").replace(")", "")
+                 for i in range(0, len(text), 90)]
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def synthetic_fixtures(papers: int, pages: int):
+    """An Atom feed of ``papers`` entries and matching ``pages``-page PDFs."""
+    words = ("graph neural network attention transformer sparse diffusion kernel "
+             "estimator regret bound convergence spectral manifold").split()
+    entries = []
+    pdfs = []
+    for i in range(papers):
+        arxiv_id = f"2401.{i + 1:05d}v1"
+        topic = " ".join(words[(i + k) % len(words)] for k in range(4))
+        entries.append(
+            f"<entry><id>http://arxiv.org/abs/{arxiv_id}</id>"
+            f"<title>On {topic} ({i})</title>"
+            f"<summary>We analyse {topic} and prove new bounds for {words[i % len(words)]} models.</summary>"
+            f"<author><name>Author {i}</name></author>"
+            f'<category term="cs.LG"/>'
+            f'<link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}" rel="related" type="application/pdf"/>'
+            f"</entry>"
+        )
+        body = f"Paper {i} about {topic}. " * 40
+        pdfs.append(make_pdf([f"Page {p + 1}. {body}" for p in range(pages)]))
+    feed = ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom">' + "".join(entries) + "</feed>")
+    return feed, pdfs
+
+
+def serve(feed: str, pdfs: list[bytes]) -> ThreadingHTTPServer:
+    """Serve the feed at ``/api/query`` and the PDFs at ``/pdf/<anything>``."""
+    header, _, rest = feed.partition("<entry>")
+    entries = ["<entry>" + e for e in rest.split("<entry>")] if rest else []
+    footer = "</feed>"
+    if entries:
+        entries[-1] = entries[-1].replace("</feed>", "")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == "/api/query":
+                query = parse_qs(parts.query)
+                start = int(query.get("start", ["0"])[0])
+                count = int(query.get("max_results", ["10"])[0])
+                base = f"http://{self.headers['Host']}"
+                page = "".join(entries[start:start + count])
+                page = re.sub(r"https?://arxiv\.org/pdf/", f"{base}/pdf/arxiv.org/pdf/", page)
+                body = (header + page + footer).encode()
+                content_type = "application/atom+xml"
+            elif parts.path.startswith("/pdf/") and pdfs:
+                body = pdfs[sum(map(ord, parts.path)) % len(pdfs)]
+                content_type = "application/pdf"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def scripted_model(steps: list[str], latency: float = 0.0):
+    """A chat model that walks through ``steps`` once per user turn, taking
+    ``latency`` seconds per call."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class ScriptedChatModel(BaseChatModel):
+        model: str = "scripted"
+
+        @property
+        def _llm_type(self):
+            return "scripted"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(latency)
+            turn = sum(isinstance(m, HumanMessage) for m in messages)
+            last_user = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+            step = sum(isinstance(m, AIMessage) for m in messages[last_user:])
+            calls = []
+            if step < len(steps):
+                action = steps[step]
+                if action == "search":
+                    calls = [{"name": "arxiv_search", "args": {"topic": "graph neural networks"}}]
+                elif action == "read":
+                    results = next(m.content for m in reversed(messages) if isinstance(m, ToolMessage))
+                    urls = list(dict.fromkeys(re.findall(r"https?://[^\s\"',]+/pdf/[^\s\"',]+", results)))
+                    calls = [{"name": "read_pdf", "args": {"url": url}} for url in urls[:3]]
+                elif action == "write":
+                    calls = [{"name": "render_latex_pdf", "args": {"latex_content": PAPER}}]
+            for i, call in enumerate(calls):
+                call["id"] = f"call_{turn}_{step}_{i}"
+            content = "" if calls else f"Summary of turn {turn}: " + "findings " * 50
+            prompt_chars = sum(len(str(m.content)) for m in messages)
+            message = AIMessage(content, tool_calls=calls, usage_metadata={
+                "input_tokens": prompt_chars // 4,
+                "output_tokens": len(content) // 4 + 20 * len(calls),
+                "total_tokens": prompt_chars // 4 + len(content) // 4 + 20 * len(calls),
+            })
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    return ScriptedChatModel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, default="search-read-write")
+    parser.add_argument("--turns", type=int, default=2, help="Turns on the same thread")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run turns with graph.ainvoke instead of graph.invoke")
+    parser.add_argument("--fixtures", help="Directory with feed.xml and *.pdf to replay")
+    parser.add_argument("--papers", type=int, default=20, help="Synthetic papers in the feed")
+    parser.add_argument("--pages", type=int, default=12, help="Pages per synthetic PDF")
+    parser.add_argument("--model-latency", type=float, default=0.0,
+                        help="Seconds each scripted model call takes")
+    parser.add_argument("--real-tectonic", action="store_true")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = Path(args.fixtures)
+        feed = (fixtures / "feed.xml").read_text()
+        pdfs = [p.read_bytes() for p in sorted(fixtures.glob("*.pdf"))]
+    else:
+        feed, pdfs = synthetic_fixtures(args.papers, args.pages)
+    server = serve(feed, pdfs)
+    workdir = Path(tempfile.mkdtemp(prefix="bench_loop_"))
+
+    # Everything the project modules read at import time points at the sandbox
+    os.environ["AI_RESEARCHER_CACHE_DIR"] = str(workdir / "cache")
+    os.environ["OUTPUT_DIR"] = str(workdir / "output")
+    os.environ["ARXIV_API_URL"] = f"http://127.0.0.1:{server.server_port}/api/query"
+    if not args.real_tectonic:
+        bin_dir = workdir / "bin"
+        bin_dir.mkdir()
+        stub = bin_dir / "tectonic"
+        stub.write_text(STUB_TECTONIC)
+        stub.chmod(stub.stat().st_mode | stat.S_IEXEC)
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+
+    import research_graph
+    import tracing
+    from checkpointer import create_checkpointer
+
+    events = []
+    tracing.tracer.add_sink(events.append)
+    graph = research_graph.build_graph(
+        model=scripted_model(SCENARIOS[args.scenario], args.model_latency),
+        checkpointer=create_checkpointer(str(workdir / "checkpoints.sqlite")),
+    )
+    config = {"configurable": {"thread_id": "bench"}}
+
+    print(f"scenario {args.scenario}, {'async' if args.use_async else 'sync'}, "
+          f"{len(pdfs)} PDFs, sandbox {workdir}")
+    tracemalloc.start()
+    for turn in range(1, args.turns + 1):
+        messages = [{"role": "user", "content": f"Research graph neural networks, turn {turn}"}]
+        if turn == 1:
+            messages.insert(0, {"role": "system", "content": research_graph.INITIAL_PROMPT})
+        events.clear()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        if args.use_async:
+            asyncio.run(graph.ainvoke({"messages": messages}, config))
+        else:
+            graph.invoke({"messages": messages}, config)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        state = graph.get_state(config).values
+
+        print(f"\nturn {turn}")
+        print(f"  {'step':<28} {'ms':>8} {'KB':>8} {'pages':>6} {'hits':>5} {'tokens':>7} {'out KB':>7}")
+        for event in events:
+            tokens = event["prompt_tokens"] + event["completion_tokens"]
+            print(f"  {event['kind'] + ': ' + event['name']:<28} {event['seconds'] * 1000:>8.1f} "
+                  f"{event['bytes'] / 1024:>8.1f} {event['pages']:>6} {event['cache_hits']:>5} {tokens:>7} "
+                  f"{event['result_bytes'] / 1024:>7.1f}"
+                  + (f"  error={event['error']}" if event["error"] else ""))
+        print(f"  wall {elapsed * 1000:.1f} ms, peak memory {peak / 1e6:.1f} MB, "
+              f"state {len(state['messages'])} messages / {len(pickle.dumps(state)) / 1024:.1f} KB")
+
+    tracemalloc.stop()
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Measure checkpointed state size and per-turn cost over a long session.
+
+Usage:
+    python benchmarks/bench_state_growth.py [--turns 50] [--tool-chars 20000]
+
+Runs the agent/tools graph used by ``ai_researcher2.py`` and ``app.py`` with a
+scripted model (every other turn calls a tool that returns a paper-sized
+string) in two modes:
+
+* ``legacy``: the agent node returns ``messages + [new]`` and every turn
+  re-sends the system prompt and the whole session history without IDs, as
+  ``process_message`` used to do.
+* ``delta``: the agent node returns only the new message (with a stable ID)
+  and each turn sends only the new user message.
+
+For each mode it reports the number of messages in the checkpointed state, the
+pickled state size and the time of the turn.
+"""
+import argparse
+import pickle
+import time
+import uuid
+from typing import Annotated, Literal
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode
+from typing_extensions import TypedDict
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def build_graph(mode: str, tool_chars: int):
+    @tool
+    def fake_read_pdf(url: str) -> str:
+        """Return a paper-sized string."""
+        return "x" * tool_chars
+
+    def call_model(state: State):
+        messages = state["messages"]
+        last = messages[-1]
+        # Odd-numbered questions trigger a tool call
+        if isinstance(last, HumanMessage) and int(last.content.split()[-1]) % 2:
+            call = {"name": "fake_read_pdf", "args": {"url": "u"}, "id": str(uuid.uuid4())}
+            normalized = {"role": "assistant", "content": "", "tool_calls": [call]}
+        else:
+            normalized = {"role": "assistant", "content": "Here is what I found. " * 20}
+        if mode == "legacy":
+            return {"messages": messages + [normalized]}
+        normalized["id"] = str(uuid.uuid4())
+        return {"messages": [normalized]}
+
+    def should_continue(state: State) -> Literal["tools", END]:
+        last = state["messages"][-1]
+        return "tools" if isinstance(last, AIMessage) and last.tool_calls else END
+
+    workflow = StateGraph(State)
+    workflow.add_node("agent", call_model)
+    workflow.add_node("tools", ToolNode([fake_read_pdf]))
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges("agent", should_continue, {"tools": "tools", END: END})
+    workflow.add_edge("tools", "agent")
+    return workflow.compile(checkpointer=MemorySaver())
+
+
+def run(mode: str, turns: int, tool_chars: int):
+    graph = build_graph(mode, tool_chars)
+    config = {"configurable": {"thread_id": mode}}
+    history = []
+    rows = []
+    for turn in range(1, turns + 1):
+        user = {"role": "user", "content": f"Question {turn}"}
+        history.append(user)
+        if mode == "legacy":
+            messages = [{"role": "system", "content": "system prompt " * 200}] + history
+        else:
+            messages = [user]
+            if turn == 1:
+                messages.insert(0, {"role": "system", "content": "system prompt " * 200})
+
+        start = time.perf_counter()
+        result = graph.invoke({"messages": messages}, config)
+        elapsed = time.perf_counter() - start
+        history.append({"role": "assistant", "content": result["messages"][-1].content})
+
+        state = graph.get_state(config).values
+        rows.append((turn, len(state["messages"]), len(pickle.dumps(state)), elapsed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--tool-chars", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args.turns, args.tool_chars) for mode in ("legacy", "delta")}
+    print(f"{'turn':>5} | {'legacy msgs':>11} {'bytes':>11} {'ms':>8} | "
+          f"{'delta msgs':>10} {'bytes':>11} {'ms':>8}")
+    for legacy, delta in zip(results["legacy"], results["delta"]):
+        turn = legacy[0]
+        if turn == 1 or turn % 10 == 0 or turn == args.turns:
+            print(f"{turn:>5} | {legacy[1]:>11} {legacy[2]:>11} {legacy[3] * 1000:>8.1f} | "
+                  f"{delta[1]:>10} {delta[2]:>11} {delta[3] * 1000:>8.1f}")
+    for mode, rows in results.items():
+        print(f"{mode}: total {sum(r[3] for r in rows):.2f}s over {len(rows)} turns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# Disk-backed LangGraph checkpointer with retention limits
+import asyncio
+import os
+import sqlite3
+import time
+import zlib
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from disk_cache import CACHE_DIR
+
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", str(CACHE_DIR / "checkpoints.sqlite"))
+# Checkpoints kept per thread; older ones are deleted after every write
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", 5))
+# Threads without activity for this many seconds are deleted
+CHECKPOINT_THREAD_TTL = int(os.getenv("CHECKPOINT_THREAD_TTL", 7 * 24 * 60 * 60))
+# Serialized values larger than this are zlib-compressed
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", 4096))
+
+
+class CompressedSerializer:
+    """Wraps a LangGraph serializer and zlib-compresses large payloads.
+
+    Compressed values are stored with their type tagged ``zlib:<type>`` so that
+    uncompressed rows written earlier still load.
+    """
+
+    def __init__(self, serde=None, min_size: int = CHECKPOINT_COMPRESS_MIN_BYTES):
+        self.serde = serde or JsonPlusSerializer()
+        self.min_size = min_size
+
+    def dumps_typed(self, obj):
+        type_, data = self.serde.dumps_typed(obj)
+        if data is not None and len(data) >= self.min_size:
+            return f"zlib:{type_}", zlib.compress(data, 6)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.startswith("zlib:"):
+            return self.serde.loads_typed((type_[5:], zlib.decompress(payload)))
+        return self.serde.loads_typed(data)
+
+
+class PrunedSqliteSaver(SqliteSaver):
+    """``SqliteSaver`` that bounds how much history it keeps.
+
+    After every checkpoint only the ``keep_last`` most recent checkpoints (and
+    their pending writes) of that thread are kept, and threads that have been
+    idle for longer than ``thread_ttl`` seconds are deleted. The graphs in this
+    project only use plain reducer channels, so every checkpoint holds the full
+    state and dropping older ones never loses data needed to resume.
+
+    Args:
+        conn: SQLite connection (opened with ``check_same_thread=False``)
+        keep_last: Checkpoints kept per thread and namespace
+        thread_ttl: Seconds of inactivity after which a thread is deleted
+        compress_min_bytes: Payloads at least this large are compressed
+    """
+
+    def __init__(self, conn, *, keep_last: int = CHECKPOINT_KEEP_LAST,
+                 thread_ttl: int | None = CHECKPOINT_THREAD_TTL,
+                 compress_min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES):
+        super().__init__(conn, serde=CompressedSerializer(min_size=compress_min_bytes))
+        self.keep_last = keep_last
+        self.thread_ttl = thread_ttl
+        self._last_expiry = 0.0
+
+    def setup(self):
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_activity ("
+            " thread_id TEXT PRIMARY KEY,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(saved["configurable"]["thread_id"])
+        checkpoint_ns = saved["configurable"]["checkpoint_ns"]
+        now = time.time()
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) VALUES (?, ?)",
+                (thread_id, now),
+            )
+            stale = cur.execute(
+                "SELECT checkpoint_id FROM checkpoints"
+                " WHERE thread_id = ? AND checkpoint_ns = ?"
+                " ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+                (thread_id, checkpoint_ns, self.keep_last),
+            ).fetchall()
+            if stale:
+                rows = [(thread_id, checkpoint_ns, checkpoint_id) for (checkpoint_id,) in stale]
+                cur.executemany(
+                    "DELETE FROM checkpoints"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    rows,
+                )
+                cur.executemany(
+                    "DELETE FROM writes"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    rows,
+                )
+        # Expiring idle threads needs a scan, so do it at most once a minute
+        if self.thread_ttl is not None and now - self._last_expiry > 60:
+            self._last_expiry = now
+            self.expire_threads()
+        return saved
+
+    def expire_threads(self) -> int:
+        """Delete threads idle for longer than ``thread_ttl``; returns how many."""
+        cutoff = time.time() - self.thread_ttl
+        with self.cursor() as cur:
+            idle = cur.execute(
+                "SELECT thread_id FROM thread_activity WHERE updated_at < ?", (cutoff,)
+            ).fetchall()
+        for (thread_id,) in idle:
+            self.delete_thread(thread_id)
+        if idle:
+            print(f"Expired {len(idle)} idle checkpoint threads")
+        return len(idle)
+
+    def delete_thread(self, thread_id):
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+    # SqliteSaver is sync only; the async API used by graph.astream runs the
+    # same (short, lock-protected) queries in a worker thread
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer(path: str = CHECKPOINT_DB) -> PrunedSqliteSaver:
+    """Open (or create) the checkpoint database at ``path``."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    return PrunedSqliteSaver(conn)
@@ -0,0 +1,152 @@
+# Keep the prompt sent to the model within a token budget
+import json
+import os
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage, convert_to_messages
+
+# Rough budget for the messages sent on each model call (about 4 characters per token)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 60000))
+# The most recent messages are sent verbatim, unless they alone exceed the budget
+CONTEXT_KEEP_RECENT = int(os.getenv("CONTEXT_KEEP_RECENT", 6))
+# Older tool outputs longer than this are replaced by a summary
+TOOL_SUMMARY_CHARS = int(os.getenv("CONTEXT_TOOL_SUMMARY_CHARS", 600))
+
+
+def _text(message) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+    )
+
+
+def estimate_tokens(message) -> int:
+    """Cheap token estimate (characters / 4) for a LangChain message."""
+    chars = len(_text(message))
+    for call in getattr(message, "tool_calls", None) or []:
+        chars += len(json.dumps(call.get("args", {}), default=str))
+    return chars // 4 + 4
+
+
+def summarize_tool_output(message: ToolMessage, limit: int = TOOL_SUMMARY_CHARS) -> str:
+    """Replace a long tool result with a short summary that points at where
+    the full content can be found again; plain text keeps its first ``limit``
+    characters."""
+    text = _text(message)
+    name = message.name or "tool"
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+
+    if isinstance(data, dict) and isinstance(data.get("entries"), list):
+        lines = [
+            f"- {entry.get('id')}: {' '.join((entry.get('title') or '').split())}"
+            for entry in data["entries"]
+        ]
+        return (f"[Earlier {name} result, summarized: {len(lines)} papers]\n"
+                + "\n".join(lines))
+
+    note = f"[Earlier {name} result, {len(text)} characters, truncated"
+    if name.startswith("read_pdf"):
+        note += "; the full text is indexed, use search_library to look things up in it"
+    return text[:limit] + "\n" + note + "]"
+
+
+def compact_messages(messages, budget: int | None = None,
+                     keep_recent: int | None = None):
+    """Return a copy of ``messages`` that fits the token budget.
+
+    The system prompt and the last ``keep_recent`` messages are kept verbatim
+    while the budget allows.
+    Older tool outputs are replaced by summaries and, if the prompt is still
+    over budget, the oldest whole turns (a user message and everything up to
+    the next one) are dropped, then the oldest steps of the oldest remaining
+    turn (a model message with its tool results), which are replaced by a
+    note listing the tools they called. If even the recent messages are over
+    budget, their long tool outputs are summarized too. The state itself is
+    never modified.
+
+    Args:
+        messages: The conversation, as LangChain messages or message dicts
+        budget: Token budget, defaults to ``CONTEXT_TOKEN_BUDGET``
+        keep_recent: Defaults to ``CONTEXT_KEEP_RECENT``
+
+    Returns:
+        The compacted list of messages
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    keep_recent = CONTEXT_KEEP_RECENT if keep_recent is None else keep_recent
+    messages = convert_to_messages(messages)
+    before = sum(estimate_tokens(m) for m in messages)
+
+    recent_start = max(len(messages) - keep_recent, 0)
+    compacted = []
+    for i, message in enumerate(messages):
+        if (i < recent_start and isinstance(message, ToolMessage)
+                and len(_text(message)) > TOOL_SUMMARY_CHARS):
+            message = message.model_copy(update={"content": summarize_tool_output(message)})
+        compacted.append(message)
+
+    total = sum(estimate_tokens(m) for m in compacted)
+    if total > budget:
+        system = [m for m in compacted if isinstance(m, SystemMessage)]
+        rest = [m for m in compacted if not isinstance(m, SystemMessage)]
+        # Only cut at user messages so tool calls stay paired with their results
+        turn_starts = [i for i, m in enumerate(rest) if isinstance(m, HumanMessage)]
+        cut = 0
+        for start in turn_starts[1:]:
+            if total <= budget or start > len(rest) - keep_recent:
+                break
+            total -= sum(estimate_tokens(m) for m in rest[cut:start])
+            cut = start
+        if cut:
+            print(f"Context: dropped {cut} messages from the oldest turns")
+        rest = rest[cut:]
+
+        # A single long turn (many tool calls) can still be over budget; drop its
+        # oldest steps whole so every remaining tool call keeps its result
+        start = end = 1 if rest and isinstance(rest[0], HumanMessage) else 0
+        calls = []
+        while total > budget and end < len(rest) and isinstance(rest[end], AIMessage):
+            stop = end + 1
+            while stop < len(rest) and isinstance(rest[stop], ToolMessage):
+                stop += 1
+            if stop > len(rest) - keep_recent:
+                break
+            calls += [f"{call['name']}({json.dumps(call.get('args', {}), default=str)[:100]})"
+                      for call in rest[end].tool_calls]
+            total -= sum(estimate_tokens(m) for m in rest[end:stop])
+            end = stop
+        if end > start:
+            note = AIMessage(content=(
+                f"[{end - start} earlier messages of this turn were dropped to fit the context. "
+                f"Tools called in them: {', '.join(calls) or 'none'}]"))
+            total += estimate_tokens(note)
+            print(f"Context: dropped {end - start} messages from the current turn")
+            rest = rest[:start] + [note] + rest[end:]
+
+        # Last resort: the recent messages themselves are too long, e.g. the
+        # full text of a PDF; cut their tool outputs, largest first, by as much
+        # as needed (but at least down to TOOL_SUMMARY_CHARS)
+        long_outputs = sorted(
+            (i for i, m in enumerate(rest)
+             if isinstance(m, ToolMessage) and len(_text(m)) > TOOL_SUMMARY_CHARS),
+            key=lambda i: -estimate_tokens(rest[i]),
+        )
+        for i in long_outputs:
+            if total <= budget:
+                break
+            # The extra 200 characters make room for the truncation note
+            keep = max(len(_text(rest[i])) - (total - budget) * 4 - 200, TOOL_SUMMARY_CHARS)
+            summary = rest[i].model_copy(update={"content": summarize_tool_output(rest[i], keep)})
+            total += estimate_tokens(summary) - estimate_tokens(rest[i])
+            rest[i] = summary
+        if total > budget:
+            print(f"Context: still {total} tokens after compaction (budget {budget})")
+        compacted = system + rest
+
+    after = sum(estimate_tokens(m) for m in compacted)
+    if after < before:
+        print(f"Context: {before} -> {after} tokens (saved {before - after})")
+    return compacted
@@ -0,0 +1,143 @@
+# Small on-disk key/value cache shared by the research tools
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# All caches live under this directory unless an explicit path is given
+CACHE_DIR = Path(os.getenv("AI_RESEARCHER_CACHE_DIR", ".cache")).absolute()
+
+
+class DiskCache:
+    """SQLite-backed key/value store with TTL expiry and LRU eviction.
+
+    Values are stored as JSON, so anything a tool returns to the LLM can be
+    cached as-is. The store is bounded by entry count and, optionally, by the
+    total size of the encoded values; the least recently used entries are
+    evicted first.
+
+    Args:
+        name: File name of the database inside ``CACHE_DIR`` (or a full path)
+        ttl: Seconds an entry stays fresh, ``None`` to never expire
+        max_entries: Maximum number of entries kept
+        max_bytes: Maximum total size of the stored values, ``None`` for no limit
+    """
+
+    def __init__(self, name, ttl=None, max_entries=1000, max_bytes=None):
+        path = Path(name)
+        if not path.is_absolute():
+            path = CACHE_DIR / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        """Return the cached value for ``key`` or ``default`` if missing/expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return default
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        """Store ``value`` under ``key`` and evict old entries if over budget."""
+        encoded = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self):
+        # Expired entries go first, then least recently used ones
+        if self.ttl is not None:
+            cur = self._conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        rows = self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at ASC"
+        )
+        stale = []
+        for key, size in rows:
+            over_count = self.max_entries is not None and count > self.max_entries
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        if stale:
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+            self.evictions += len(stale)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus the current store size."""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+        }
@@ -0,0 +1,286 @@
+# Shared HTTP client used by every tool that talks to the network
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import tracing
+
+if TYPE_CHECKING:
+    import httpx
+
+# (connect, read) timeout in seconds; a stalled server must not hang a tool
+TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", 10)),
+    float(os.getenv("HTTP_READ_TIMEOUT", 60)),
+)
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 4))
+BACKOFF = float(os.getenv("HTTP_BACKOFF", 1.0))
+RETRY_STATUSES = {429, 503}
+USER_AGENT = "ai-research-assistant/0.1 (+https://github.com/codewithkaran-21/ai-research-assistant)"
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    ``reserve()`` books the next free slot and returns how long the caller has
+    to wait for it, so callers that are about to block (threads or asyncio
+    tasks) can each wait in their own way while still being served in order.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum burst size
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# arXiv asks automated clients for at most one request every three seconds
+ARXIV_RATE = float(os.getenv("ARXIV_RATE_LIMIT", 1 / 3))
+rate_limits = {
+    "export.arxiv.org": TokenBucket(ARXIV_RATE),
+    "arxiv.org": TokenBucket(ARXIV_RATE),
+}
+
+
+def set_rate_limit(host: str, rate: float | None, capacity: int = 1):
+    """Limit requests to ``host`` to ``rate`` per second (``None`` removes the limit)."""
+    if rate is None:
+        rate_limits.pop(host, None)
+    else:
+        rate_limits[host] = TokenBucket(rate, capacity)
+
+
+class RequestMetrics:
+    """Per-request latency log plus per-host aggregates."""
+
+    def __init__(self, maxlen: int = 1000):
+        self.recent = deque(maxlen=maxlen)
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def record(self, host, url, status, latency, attempts, nbytes, waited):
+        entry = {
+            "host": host,
+            "url": url,
+            "status": status,
+            "latency": latency,
+            "attempts": attempts,
+            "bytes": nbytes,
+            "rate_limit_wait": waited,
+        }
+        with self._lock:
+            self.recent.append(entry)
+            agg = self.hosts.setdefault(host, {
+                "requests": 0, "errors": 0, "retries": 0, "bytes": 0,
+                "total_latency": 0.0, "max_latency": 0.0, "rate_limit_wait": 0.0,
+            })
+            agg["requests"] += 1
+            agg["errors"] += status is None or status >= 400
+            agg["retries"] += attempts - 1
+            agg["bytes"] += nbytes
+            agg["total_latency"] += latency
+            agg["max_latency"] = max(agg["max_latency"], latency)
+            agg["rate_limit_wait"] += waited
+        # Counted against the traced tool step running the request, if any
+        tracing.add(bytes=nbytes)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                host: dict(agg, mean_latency=agg["total_latency"] / agg["requests"])
+                for host, agg in self.hosts.items()
+            }
+
+
+metrics = RequestMetrics()
+
+session = requests.Session()
+session.headers["User-Agent"] = USER_AGENT
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
+
+
+# httpx clients are bound to the event loop that created them:
+# loop -> (client, the async generator that closes it)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+async def _close_with_loop(client):
+    # Event loops finalize their pending async generators when they shut down
+    # (asyncio.run calls loop.shutdown_asyncgens), which closes the client
+    try:
+        yield
+    finally:
+        # The generator references the loop, so the entry must go explicitly
+        _async_clients.pop(asyncio.get_running_loop(), None)
+        await client.aclose()
+
+
+async def _async_client() -> "httpx.AsyncClient":
+    # httpx is only imported by the async tools, on first use
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+            follow_redirects=True,
+        )
+        closer = _close_with_loop(client)
+        await closer.asend(None)
+        entry = _async_clients[loop] = (client, closer)
+    return entry[0]
+
+
+def _retry_delay(response, attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return BACKOFF * 2 ** attempt + random.uniform(0, BACKOFF)
+
+
+def get(url: str, headers: dict | None = None, params: dict | None = None,
+        stream: bool = False, timeout=None) -> requests.Response:
+    """GET ``url`` through the shared session.
+
+    Requests are rate limited per host, time out after ``TIMEOUT`` and are
+    retried with exponential backoff on 429/503 responses and connection
+    errors. The final response is returned whatever its status, so callers keep
+    their own error handling.
+
+    Args:
+        url: URL to fetch
+        headers: Extra request headers
+        params: Query string parameters
+        stream: Do not read the body up front (see ``requests``)
+        timeout: Override the default ``(connect, read)`` timeout
+
+    Returns:
+        The ``requests.Response`` of the last attempt
+    """
+    host = urlsplit(url).hostname or ""
+    bucket = rate_limits.get(host)
+    waited = 0.0
+    started = time.perf_counter()
+    response = None
+    error = None
+
+    for attempt in range(MAX_RETRIES + 1):
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+        error = None
+        try:
+            response = session.get(
+                url, headers=headers, params=params, stream=stream,
+                timeout=timeout or TIMEOUT,
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            response, error = None, e
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                break
+        if attempt == MAX_RETRIES:
+            break
+        delay = _retry_delay(response, attempt)
+        print(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}/{MAX_RETRIES}): "
+              f"{error or response.status_code}")
+        if response is not None:
+            # An unread streamed body would keep its pooled connection busy
+            response.close()
+        time.sleep(delay)
+
+    latency = time.perf_counter() - started
+    if response is None:
+        metrics.record(host, url, None, latency, attempt + 1, 0, waited)
+        raise error
+    if stream:
+        nbytes = int(response.headers.get("Content-Length") or 0)
+    else:
+        nbytes = len(response.content)
+    metrics.record(host, url, response.status_code, latency, attempt + 1, nbytes, waited)
+    return response
+
+
+async def aget(url: str, headers: dict | None = None, params: dict | None = None,
+               timeout=None) -> "httpx.Response":
+    """Async version of ``get`` built on a shared ``httpx.AsyncClient``.
+
+    Uses the same per-host rate limits, retry policy and metrics as ``get``;
+    waiting for the rate limit or a retry yields to the event loop instead of
+    blocking a thread.
+    """
+    import httpx
+
+    host = urlsplit(url).hostname or ""
+    bucket = rate_limits.get(host)
+    connect, read = timeout or TIMEOUT
+    client = await _async_client()
+    waited = 0.0
+    started = time.perf_counter()
+    response = None
+    error = None
+
+    for attempt in range(MAX_RETRIES + 1):
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                waited += delay
+        error = None
+        try:
+            response = await client.get(
+                url, headers=headers, params=params,
+                timeout=httpx.Timeout(read, connect=connect),
+            )
+        except httpx.TransportError as e:
+            response, error = None, e
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                break
+        if attempt == MAX_RETRIES:
+            break
+        delay = _retry_delay(response, attempt)
+        print(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}/{MAX_RETRIES}): "
+              f"{error or response.status_code}")
+        await asyncio.sleep(delay)
+
+    latency = time.perf_counter() - started
+    if response is None:
+        metrics.record(host, url, None, latency, attempt + 1, 0, waited)
+        raise error
+    metrics.record(host, url, response.status_code, latency, attempt + 1,
+                   len(response.content), waited)
+    return response
@@ -0,0 +1,206 @@
+# In-process scheduler for agent turns, shared by all web app sessions
+import asyncio
+import os
+import threading
+import time
+import uuid
+import itertools
+from collections import deque
+
+# Agent turns that may run at the same time, across all sessions
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+# Turns a single session may have waiting behind its running one
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", 5))
+# Seconds a finished job is kept so the UI can pick up its result
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", 3600))
+# How often the web app polls the progress of running jobs
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when a session already has ``JOB_QUEUE_LIMIT`` jobs waiting."""
+
+
+class Job:
+    """One queued or running unit of work and its progress.
+
+    The job function is ``async def func(job)``; it reports progress with
+    ``job.progress(...)`` and may keep partial output in ``job.text``. The UI
+    polls these fields, they are never pushed.
+    """
+
+    def __init__(self, session, func, label: str = ""):
+        self.id = uuid.uuid4().hex
+        self.session = str(session)
+        self.func = func
+        self.label = label
+        self.status = QUEUED
+        self.events = []
+        self.text = ""
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+        self._loop = None
+        self._task = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds the job has been running (0 while queued)."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def progress(self, line: str):
+        self.events.append(line)
+
+    def _cancel(self):
+        with self._lock:
+            self.cancel_requested = True
+            if self._loop is not None:
+                # Interrupts the job at its next await (download, model call, ...)
+                self._loop.call_soon_threadsafe(self._task.cancel)
+
+    async def _run(self):
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.current_task()
+            if self.cancel_requested:
+                raise asyncio.CancelledError
+        return await self.func(self)
+
+
+class JobScheduler:
+    """Runs jobs on one shared event loop, fairly across sessions.
+
+    Each session has its own FIFO queue and at most one running job, so the
+    turns of a conversation stay in order. A free worker takes the next job of
+    the waiting session that was served least recently, so one user with many
+    queued turns cannot starve the others. Jobs run as tasks on a single event
+    loop in the scheduler's own thread, so async clients created by one job
+    (the model's gRPC channel, ``http_client``'s httpx client) stay usable by
+    the next, and jobs survive Streamlit reruns.
+
+    Args:
+        workers: Maximum number of jobs running at once
+        queue_limit: Maximum number of waiting jobs per session
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_limit: int = JOB_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="job-loop", daemon=True).start()
+        self._queues = {}
+        self._running = {}
+        # When each session last had a job started, for least-recently-served order
+        self._served = {}
+        self._tickets = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session, func, label: str = "") -> Job:
+        """Queue ``async def func(job)`` for ``session`` and return its ``Job``."""
+        job = Job(session, func, label)
+        with self._lock:
+            self._prune()
+            queue = self._queues.setdefault(job.session, deque())
+            if len(queue) >= self.queue_limit:
+                raise JobQueueFull(f"{len(queue)} requests are already waiting in this session")
+            queue.append(job)
+            self._jobs[job.id] = job
+            self._dispatch()
+        return job
+
+    def get(self, job_id) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def session_jobs(self, session) -> list[Job]:
+        """The running and queued jobs of ``session``, in execution order."""
+        session = str(session)
+        with self._lock:
+            running = [self._running[session]] if session in self._running else []
+            return running + list(self._queues.get(session, ()))
+
+    def cancel(self, job_id) -> bool:
+        """Cancel a queued or running job; returns False if it already finished."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            queue = self._queues.get(job.session)
+            if queue is not None and job in queue:
+                queue.remove(job)
+                if not queue and job.session not in self._running:
+                    del self._queues[job.session]
+                job.finished = time.time()
+                job.status = CANCELLED
+                return True
+        job._cancel()
+        return True
+
+    def cancel_session(self, session) -> int:
+        """Cancel every job of ``session``; returns how many were cancelled."""
+        return sum(self.cancel(job.id) for job in reversed(self.session_jobs(session)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": len(self._running),
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "sessions": len(set(self._running) | {s for s, q in self._queues.items() if q}),
+            }
+
+    def _dispatch(self):
+        # Called with the lock held; never runs more jobs than workers at once
+        while len(self._running) < self.workers:
+            waiting = [s for s, queue in self._queues.items() if queue and s not in self._running]
+            if not waiting:
+                return
+            # The session served least recently goes first (new sessions before all)
+            session = min(waiting, key=lambda s: self._served.get(s, 0))
+            self._served[session] = next(self._tickets)
+            job = self._queues[session].popleft()
+            self._running[session] = job
+            job.status = RUNNING
+            job.started = time.time()
+            asyncio.run_coroutine_threadsafe(self._execute(job), self._loop)
+
+    async def _execute(self, job: Job):
+        try:
+            job.result = await job._run()
+            status = DONE
+        except asyncio.CancelledError:
+            status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            status = FAILED
+            print(f"Job {job.id} ({job.label!r}) failed: {job.error}")
+        with job._lock:
+            job._loop = None
+        job.finished = time.time()
+        job.status = status
+        with self._lock:
+            del self._running[job.session]
+            if not self._queues.get(job.session):
+                self._queues.pop(job.session, None)
+            self._dispatch()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [i for i, job in self._jobs.items() if job.done and job.finished < cutoff]:
+            del self._jobs[job_id]
+        sessions = {job.session for job in self._jobs.values()}
+        for session in [s for s in self._served if s not in sessions]:
+            del self._served[session]
@@ -0,0 +1,281 @@
+# Fast structural checks for LaTeX documents before they are compiled
+import re
+from langchain_core.tools import ToolException
+
+MAX_ISSUES = 20
+
+# Issue severities: errors are certain to break the compile and stop it;
+# warnings come from heuristics that a custom class, package or macro can
+# make wrong, so they are only reported alongside tectonic's own errors
+ERROR, WARNING = "error", "warning"
+
+# Environments whose body is not LaTeX and must not be checked
+VERBATIM_ENVS = {"verbatim", "verbatim*", "lstlisting", "minted", "comment"}
+# Display math environments, which are errors inside $...$ / \[...\]
+MATH_ENVS = {
+    "equation", "equation*", "align", "align*", "gather", "gather*",
+    "multline", "multline*", "eqnarray", "eqnarray*", "displaymath",
+}
+
+AMSMATH = ("amsmath", "mathtools", "physics", "empheq")
+# Commonly used macros/environments that are not part of the LaTeX kernel,
+# with the packages (or packages loading them) that provide them; the first
+# one is suggested when none is loaded
+PACKAGE_MACROS = {
+    "mathbb": ("amssymb", "amsfonts", "bbm", "dsfont"),
+    "mathfrak": ("amssymb", "amsfonts"),
+    "text": AMSMATH + ("amstext",),
+    "operatorname": AMSMATH,
+    "DeclareMathOperator": AMSMATH,
+    "eqref": AMSMATH,
+    "dfrac": AMSMATH,
+    "tfrac": AMSMATH,
+    "boldsymbol": AMSMATH + ("amsbsy",),
+    "coloneqq": ("mathtools",),
+    "includegraphics": ("graphicx", "graphics", "tikz", "pgf"),
+    "href": ("hyperref",),
+    "url": ("url", "hyperref", "xurl"),
+    "toprule": ("booktabs",),
+    "midrule": ("booktabs",),
+    "bottomrule": ("booktabs",),
+    "textcolor": ("xcolor", "color", "tikz", "pgf"),
+    "SI": ("siunitx",),
+    "num": ("siunitx",),
+}
+PACKAGE_ENVS = {
+    "align": AMSMATH,
+    "align*": AMSMATH,
+    "gather": AMSMATH,
+    "gather*": AMSMATH,
+    "multline": AMSMATH,
+    "multline*": AMSMATH,
+    "equation*": AMSMATH,
+    "pmatrix": AMSMATH,
+    "bmatrix": AMSMATH,
+    "cases": AMSMATH,
+    "proof": ("amsthm",),
+    "algorithm": ("algorithm", "algorithm2e"),
+    "algorithmic": ("algorithmic",),
+    "tikzpicture": ("tikz",),
+    "lstlisting": ("listings",),
+    "minted": ("minted",),
+}
+# Environments that only exist once the document defines them
+THEOREM_ENVS = {"theorem", "lemma", "proposition", "corollary", "definition", "remark", "example"}
+# Document classes whose loaded packages are known; other classes may load
+# anything, so package checks are skipped for them
+CLASS_PACKAGES = {
+    "article": set(), "report": set(), "book": set(), "letter": set(), "minimal": set(),
+    "scrartcl": set(), "scrreprt": set(), "scrbook": set(),
+    "amsart": {"amsmath", "amsthm", "amsfonts"},
+    "amsbook": {"amsmath", "amsthm", "amsfonts"},
+    "amsproc": {"amsmath", "amsthm", "amsfonts"},
+}
+
+COMMENT_RE = re.compile(r"(?<!\\)%[^\n]*")
+# Inline verbatim, \verb|...| or \lstinline+...+ (any delimiter, one line)
+INLINE_VERBATIM_RE = re.compile(r"\\(?:verb|lstinline)\*?(?:\[[^\]\n]*\])?([^A-Za-z\s{])[^\n]*?\1")
+TOKEN_RE = re.compile(
+    r"\\(begin|end)\s*\{([^}]*)\}"     # environments
+    r"|\\([A-Za-z@]+)\*?"              # control words
+    r"|\\(.)"                          # control symbols (\{, \$, \[, ...)
+    r"|(\$\$?)"                        # math shifts
+    r"|([{}])",                        # groups
+    re.DOTALL,
+)
+OPENERS = {"$": "$", "$$": "$$", ")": "\\(", "]": "\\["}
+
+
+def format_issues(issues: list[dict]) -> str:
+    """One ``line N: ...`` line per issue, warnings marked as such."""
+    lines = []
+    for issue in issues:
+        message = issue["message"]
+        if issue["severity"] == WARNING:
+            message = f"(warning) {message}"
+        lines.append(f"line {issue['line']}: {message}" if issue["line"] else message)
+    return "\n".join(lines)
+
+
+class LatexValidationError(ToolException):
+    """Raised by ``render_latex_pdf`` when ``validate_latex`` finds errors.
+
+    The message lists one problem per line (``line N: ...``) so the agent can
+    fix them all before trying again; ``issues`` keeps the structured form.
+    """
+
+    def __init__(self, issues: list[dict]):
+        self.issues = issues
+        super().__init__(
+            "LaTeX validation failed, the document was not compiled:\n" + format_issues(issues)
+        )
+
+
+def _arguments(source: str, macro: str) -> list[str]:
+    """Comma-separated brace arguments of every ``\\macro{...}`` in ``source``."""
+    names = []
+    for match in re.finditer(r"\\" + macro + r"\*?\s*(?:\[[^\]]*\])?\s*\{([^}]*)\}", source):
+        names.extend(name.strip().lstrip("\\") for name in match.group(1).split(","))
+    return names
+
+
+def _check_packages(source, used_macros, used_envs, issues):
+    classes = _arguments(source, "documentclass")
+    if not classes or classes[0] not in CLASS_PACKAGES:
+        return
+    packages = CLASS_PACKAGES[classes[0]] | set(_arguments(source, "usepackage"))
+    defined = set(_arguments(source, "newcommand") + _arguments(source, "renewcommand")
+                  + _arguments(source, "providecommand") + _arguments(source, "DeclareMathOperator"))
+    defined |= set(re.findall(r"\\def\s*\\([A-Za-z@]+)", source))
+    defined_envs = set(_arguments(source, "newtheorem") + _arguments(source, "newenvironment"))
+
+    for macro, providers in PACKAGE_MACROS.items():
+        if macro in used_macros and macro not in defined and not packages.intersection(providers):
+            issues.append({"line": used_macros[macro],
+                           "message": f"\\{macro} needs \\usepackage{{{providers[0]}}}", "severity": WARNING})
+    for env, providers in PACKAGE_ENVS.items():
+        if env in used_envs and env not in defined_envs and not packages.intersection(providers):
+            issues.append({"line": used_envs[env],
+                           "message": f"environment {env} needs \\usepackage{{{providers[0]}}}", "severity": WARNING})
+    for env in sorted(THEOREM_ENVS):
+        if env in used_envs and env not in defined_envs:
+            issues.append({"line": used_envs[env],
+                           "message": f"environment {env} is not defined; "
+                                      f"add \\newtheorem{{{env}}}{{...}} to the preamble", "severity": WARNING})
+
+
+def validate_latex(source: str) -> list[dict]:
+    """Check ``source`` for mistakes that would make tectonic fail.
+
+    Runs in milliseconds and covers the common failure modes of generated
+    LaTeX: unbalanced braces and environments, a missing ``\\documentclass`` or
+    ``\\begin{document}``, common macros/environments used without their
+    package and unterminated or mismatched math mode. The contents of
+    ``\\verb``, ``\\lstinline`` and verbatim environments are not checked.
+
+    Only structural problems (braces, environments, the document skeleton)
+    are ``ERROR``s; the math and package checks are heuristics and are
+    reported as ``WARNING``s.
+
+    Args:
+        source: LaTeX document
+
+    Returns:
+        Problems as ``{"line": int | None, "message": str, "severity": str}``
+        dicts, errors first and then by line (empty if none were found)
+    """
+    # Inline verbatim is blanked out before comments, since it may contain a
+    # "%"; comments are removed and newlines stay, so line numbers are unchanged
+    source = INLINE_VERBATIM_RE.sub(lambda m: " " * len(m.group()), source)
+    source = COMMENT_RE.sub("", source)
+    issues = []
+    braces = []        # line of every open "{"
+    envs = []          # (name, line) of every open environment
+    maths = []         # (closer, line, brace depth, offset) of every open math mode
+    verbatim = None    # environment name while inside a verbatim body
+    used_macros = {}
+    used_envs = {}
+    line = 1
+    pos = 0
+
+    for match in TOKEN_RE.finditer(source):
+        line += source.count("\n", pos, match.start())
+        pos = match.start()
+        kind, env, word, symbol, shift, group = match.groups()
+
+        if verbatim is not None:
+            if kind == "end" and env.strip() == verbatim:
+                verbatim = None
+                envs.pop()
+            continue
+
+        # Inline math cannot span a paragraph break
+        if maths and maths[-1][0] in ("$", ")") and "\n\n" in source[maths[-1][3]:match.start()]:
+            issues.append({"line": maths[-1][1], "message": f"{OPENERS[maths[-1][0]]} math is not "
+                                                            f"closed before the end of the paragraph",
+                           "severity": WARNING})
+            maths.pop()
+
+        if kind is not None:
+            name = env.strip()
+            if kind == "begin":
+                used_envs.setdefault(name, line)
+                envs.append((name, line))
+                if name in VERBATIM_ENVS:
+                    verbatim = name
+                elif name in MATH_ENVS and maths and maths[-1][2] == len(braces):
+                    issues.append({"line": line, "message": f"\\begin{{{name}}} inside math mode "
+                                                            f"opened on line {maths[-1][1]}", "severity": WARNING})
+            elif not envs:
+                issues.append({"line": line, "message": f"\\end{{{name}}} without matching \\begin{{{name}}}",
+                               "severity": ERROR})
+            elif envs[-1][0] != name:
+                open_name, open_line = envs[-1]
+                issues.append({"line": line, "message": f"\\end{{{name}}} does not match "
+                                                        f"\\begin{{{open_name}}} on line {open_line}",
+                               "severity": ERROR})
+                if any(n == name for n, _ in envs):
+                    while envs[-1][0] != name:
+                        envs.pop()
+                    envs.pop()
+            else:
+                envs.pop()
+        elif word is not None:
+            used_macros.setdefault(word, line)
+        elif symbol is not None:
+            if symbol in "([":
+                closer = ")" if symbol == "(" else "]"
+                if maths and maths[-1][2] == len(braces):
+                    issues.append({"line": line, "message": f"\\{symbol} inside math mode opened "
+                                                            f"on line {maths[-1][1]}", "severity": WARNING})
+                maths.append((closer, line, len(braces), match.end()))
+            elif symbol in ")]":
+                if maths and maths[-1][0] == symbol:
+                    maths.pop()
+                else:
+                    issues.append({"line": line, "message": f"\\{symbol} without matching "
+                                                            f"{OPENERS[symbol]}", "severity": WARNING})
+        elif shift is not None:
+            if maths and maths[-1][2] < len(braces):
+                # A \text{...} group nested in math starts its own math mode
+                maths.append((shift, line, len(braces), match.end()))
+            elif maths and maths[-1][0] == "$" and shift == "$$":
+                # "$a$$b$": the first "$" closes, the second opens
+                maths[-1] = ("$", line, len(braces), match.end())
+            elif maths and maths[-1][0] == shift:
+                maths.pop()
+            elif maths and maths[-1][2] == len(braces):
+                closer, open_line = maths.pop()[:2]
+                issues.append({"line": line, "message": f"'{shift}' used to close math mode opened "
+                                                        f"with {OPENERS[closer]} on line {open_line}",
+                               "severity": WARNING})
+            else:
+                maths.append((shift, line, len(braces), match.end()))
+        elif group == "{":
+            braces.append(line)
+        elif braces:
+            braces.pop()
+            # Math opened inside a group ends with it
+            while maths and maths[-1][2] > len(braces):
+                issues.append({"line": maths[-1][1], "message": f"{OPENERS[maths[-1][0]]} math is "
+                                                                f"not closed inside its group", "severity": WARNING})
+                maths.pop()
+        else:
+            issues.append({"line": line, "message": "unmatched '}'", "severity": ERROR})
+
+    for open_line in braces:
+        issues.append({"line": open_line, "message": "'{' is never closed", "severity": ERROR})
+    for name, open_line in envs:
+        issues.append({"line": open_line, "message": f"\\begin{{{name}}} is never closed", "severity": ERROR})
+    for closer, open_line, _, _ in maths:
+        issues.append({"line": open_line, "message": f"{OPENERS[closer]} math is never closed", "severity": WARNING})
+
+    if "documentclass" not in used_macros:
+        issues.append({"line": None, "message": "missing \\documentclass", "severity": ERROR})
+    if "document" not in used_envs:
+        issues.append({"line": None, "message": "missing \\begin{document}", "severity": ERROR})
+    _check_packages(source, used_macros, used_envs, issues)
+
+    # Errors first, so MAX_ISSUES never cuts them for warnings
+    issues.sort(key=lambda i: (i["severity"] != ERROR, i["line"] or 0))
+    return issues[:MAX_ISSUES]
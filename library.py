@@ -0,0 +1,177 @@
+# Step1: Full-text index over every paper the assistant has read
+import os
+import re
+import sqlite3
+import threading
+import time
+from disk_cache import CACHE_DIR
+
+# Pages are split into passages of roughly this many characters
+PASSAGE_CHARS = int(os.getenv("LIBRARY_PASSAGE_CHARS", 1200))
+
+
+def _split_passages(text: str, size: int = PASSAGE_CHARS) -> list[str]:
+    """Split a page into passages of about ``size`` characters on line breaks."""
+    passages = []
+    current = []
+    length = 0
+    for line in text.splitlines():
+        if length + len(line) > size and current:
+            passages.append("\n".join(current))
+            current, length = [], 0
+        current.append(line)
+        length += len(line) + 1
+    if current:
+        passages.append("\n".join(current))
+    return [p.strip() for p in passages if p.strip()]
+
+
+class Library:
+    """Persistent SQLite FTS5 index of extracted paper text.
+
+    Every page is stored as a few passages with a reference to its paper and
+    page number, so follow-up questions can be answered from the best matching
+    passages (BM25 ranked) instead of the whole paper. Pages can be added
+    incrementally; re-adding a page replaces its previous passages.
+    """
+
+    def __init__(self, path=None):
+        path = path or CACHE_DIR / "library.sqlite"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS papers ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " title TEXT,"
+            " num_pages INTEGER,"
+            " added_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5("
+            " text, paper UNINDEXED, page UNINDEXED,"
+            " tokenize = 'porter unicode61')"
+        )
+        self._conn.commit()
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM papers WHERE key = ?", (key,)
+            ).fetchone() is not None
+
+    def add_pages(self, key: str, url: str, pages, num_pages=None, title=None):
+        """Index (or re-index) some pages of a paper.
+
+        Args:
+            key: Canonical document key (see ``pdf_cache.document_key``)
+            url: URL the paper was read from
+            pages: Iterable of ``(page_number, text)`` with 1-based page numbers
+            num_pages: Total number of pages in the paper, if known
+            title: Paper title; guessed from the first line of page 1 if omitted
+        """
+        pages = list(pages)
+        if title is None:
+            first = dict(pages).get(1, "")
+            title = next((line.strip() for line in first.splitlines() if line.strip()), None)
+        rows = [
+            (passage, key, page_number)
+            for page_number, text in pages
+            for passage in _split_passages(text)
+        ]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO papers (key, url, title, num_pages, added_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET"
+                " url = excluded.url,"
+                " title = COALESCE(excluded.title, papers.title),"
+                " num_pages = COALESCE(excluded.num_pages, papers.num_pages)",
+                (key, url, title, num_pages, time.time()),
+            )
+            self._conn.executemany(
+                "DELETE FROM passages WHERE paper = ? AND page = ?",
+                [(key, page_number) for page_number, _ in pages],
+            )
+            self._conn.executemany(
+                "INSERT INTO passages (text, paper, page) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+        print(f"Indexed {len(rows)} passages from {len(pages)} pages of {key}")
+
+    def search(self, query: str, k: int = 5, paper: str | None = None) -> list[dict]:
+        """Return the ``k`` best matching passages for ``query``.
+
+        Args:
+            query: Free-text query; every word is matched (OR), ranked by BM25
+            k: Number of passages to return
+            paper: Only search this document key
+        """
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        match = " OR ".join(f'"{w}"' for w in words)
+        sql = (
+            "SELECT passages.paper, passages.page, passages.text, bm25(passages),"
+            " papers.title, papers.url"
+            " FROM passages JOIN papers ON papers.key = passages.paper"
+            " WHERE passages MATCH ?"
+        )
+        params = [match]
+        if paper is not None:
+            sql += " AND passages.paper = ?"
+            params.append(paper)
+        sql += " ORDER BY bm25(passages) LIMIT ?"
+        params.append(k)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "paper": key,
+                "title": title,
+                "url": url,
+                "page": page,
+                "score": round(-score, 3),
+                "text": text,
+            }
+            for key, page, text, score, title, url in rows
+        ]
+
+    def papers(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, url, title, num_pages FROM papers ORDER BY added_at DESC"
+            ).fetchall()
+        return [
+            {"paper": key, "url": url, "title": title, "pages": num_pages}
+            for key, url, title, num_pages in rows
+        ]
+
+
+library = Library()
+
+
+# Step2: Convert the functionality into a tool
+from langchain_core.tools import tool
+
+
+@tool
+def search_library(query: str, k: int = 5) -> list[dict]:
+    """Search the full text of every paper that has already been read
+
+    Use this to answer follow-up questions about papers read earlier instead
+    of reading them again.
+
+    Args:
+        query: What to look for in the papers
+        k: How many passages to return
+
+    Returns:
+        The best matching passages with their paper, title, URL and page number
+    """
+    print(f"Searching library for: {query}")
+    results = library.search(query, k)
+    print(f"Found {len(results)} passages for: {query}")
+    return results
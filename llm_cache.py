@@ -0,0 +1,126 @@
+# Record/replay cache for chat model responses
+import hashlib
+import json
+import os
+import uuid
+from disk_cache import DiskCache
+import tracing
+
+# passthrough: always call the model; record: reuse cached responses and store
+# new ones; replay: only serve cached responses and fail on a miss
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "passthrough").lower()
+LLM_CACHE_MODES = ("passthrough", "record", "replay")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+_cache = None
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def get_cache() -> DiskCache:
+    """The shared response store, opened on first use."""
+    global _cache
+    if _cache is None:
+        _cache = DiskCache("llm_responses.sqlite", max_entries=None, max_bytes=LLM_CACHE_MAX_BYTES)
+    return _cache
+
+
+def _content(content):
+    # Gemini returns lists of blocks; only their text matters for the request
+    if isinstance(content, str):
+        return content
+    return [block.get("text", block) if isinstance(block, dict) else block for block in content]
+
+
+def _normalize(message) -> dict:
+    """The parts of a message the model sees; ids and metadata are dropped."""
+    normalized = {"type": message.type, "content": _content(message.content)}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        normalized["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in tool_calls]
+    if message.type == "tool":
+        normalized["name"] = message.name
+    return normalized
+
+
+def request_key(messages, tool_schemas: list, model_name: str) -> str:
+    """Stable hash of a model request."""
+    from langchain_core.messages import convert_to_messages
+
+    payload = {
+        "model": model_name,
+        "tools": tool_schemas,
+        "messages": [_normalize(m) for m in convert_to_messages(messages)],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CachedChatModel:
+    """Wraps a tool-bound chat model with the response cache.
+
+    Args:
+        bound: The chat model returned by ``bind_tools``
+        tools: The tools it was bound to (part of the cache key)
+        model_name: Model name (part of the cache key)
+        mode: ``"record"`` or ``"replay"``
+        cache: Response store, defaults to ``get_cache()``
+    """
+
+    def __init__(self, bound, tools, model_name: str, mode: str = LLM_CACHE_MODE, cache=None):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        self.bound = bound
+        self.model_name = model_name
+        self.mode = mode
+        self.cache = cache if cache is not None else get_cache()
+        self.tool_schemas = [convert_to_openai_tool(tool) for tool in tools]
+
+    def _lookup(self, messages):
+        key = request_key(messages, self.tool_schemas, self.model_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            from langchain_core.messages import messages_from_dict
+
+            tracing.add(cache_hits=1)
+            message = messages_from_dict([cached])[0]
+            # The graph's add_messages reducer keys messages by id; a replayed
+            # response must not replace the earlier message it was recorded as
+            return key, message.model_copy(update={"id": f"run-{uuid.uuid4()}"})
+        tracing.add(cache_misses=1)
+        if self.mode == "replay":
+            raise LLMCacheMiss(
+                f"No recorded response for request {key[:12]}; run with LLM_CACHE_MODE=record first"
+            )
+        return key, None
+
+    def _store(self, key, response):
+        from langchain_core.messages import message_to_dict
+
+        # Round-trip through JSON so provider metadata that is not JSON-native is kept as text
+        self.cache.set(key, json.loads(json.dumps(message_to_dict(response), default=str)))
+        return response
+
+    def invoke(self, messages, config=None, **kwargs):
+        key, response = self._lookup(messages)
+        if response is None:
+            response = self._store(key, self.bound.invoke(messages, config, **kwargs))
+        return response
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        key, response = self._lookup(messages)
+        if response is None:
+            response = self._store(key, await self.bound.ainvoke(messages, config, **kwargs))
+        return response
+
+
+def wrap(bound, tools, model_name: str, mode: str = LLM_CACHE_MODE):
+    """Wrap ``bound`` with the response cache unless ``mode`` is passthrough."""
+    if mode not in LLM_CACHE_MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(LLM_CACHE_MODES)}, not {mode!r}")
+    if mode == "passthrough":
+        return bound
+    print(f"LLM response cache in {mode} mode")
+    return CachedChatModel(bound, tools, model_name, mode)
@@ -0,0 +1,148 @@
+# Index of generated artifacts (PDFs, .tex sources) in the output directory
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from disk_cache import CACHE_DIR
+
+OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", "output")).absolute()
+# Files whose bytes are kept in memory for repeated downloads
+OUTPUT_READ_CACHE_SIZE = int(os.getenv("OUTPUT_READ_CACHE_SIZE", 8))
+
+
+class OutputIndex:
+    """Tracks the files in ``directory`` with their size, mtime and session.
+
+    The directory is rescanned with ``os.scandir`` only when its own mtime
+    changes (a file was added, removed or renamed), so listing costs one
+    ``stat`` plus an indexed SQLite query no matter how many outputs exist.
+    ``record`` tags a new artifact with the session (thread id) that made it.
+
+    Args:
+        directory: Directory holding the generated files
+        path: SQLite index file
+    """
+
+    def __init__(self, directory=None, path=None):
+        self.directory = Path(directory or OUTPUT_DIR)
+        path = path or CACHE_DIR / "outputs.sqlite"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            " name TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " session TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outputs_mtime ON outputs (mtime)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outputs_session ON outputs (session, mtime)")
+        self._conn.commit()
+        # Never equal to a directory mtime, or to None for a missing directory,
+        # so the first refresh always reconciles rows left by earlier runs
+        self._scanned_mtime = object()
+
+    def _refresh(self):
+        try:
+            dir_mtime = self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            dir_mtime = None
+        if dir_mtime == self._scanned_mtime:
+            return
+        entries = {}
+        if dir_mtime is not None:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries[entry.name] = (Path(entry.name).suffix.lstrip(".").lower(),
+                                               st.st_size, st.st_mtime)
+        with self._lock:
+            known = {name: (size, mtime) for name, size, mtime in
+                     self._conn.execute("SELECT name, size, mtime FROM outputs")}
+            gone = [(name,) for name in known.keys() - entries.keys()]
+            changed = [(name, kind, size, mtime) for name, (kind, size, mtime) in entries.items()
+                       if known.get(name) != (size, mtime)]
+            self._conn.executemany("DELETE FROM outputs WHERE name = ?", gone)
+            self._conn.executemany(
+                "INSERT INTO outputs (name, kind, size, mtime) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET size = excluded.size, mtime = excluded.mtime",
+                changed,
+            )
+            self._conn.commit()
+            self._scanned_mtime = dir_mtime
+
+    def record(self, path, session: str | None = None):
+        """Add (or update) ``path`` in the index and tag it with ``session``."""
+        path = Path(path)
+        st = path.stat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outputs (name, kind, size, mtime, session) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,"
+                " session = COALESCE(excluded.session, outputs.session)",
+                (path.name, path.suffix.lstrip(".").lower(), st.st_size, st.st_mtime,
+                 None if session is None else str(session)),
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _where(kind, session):
+        clauses, params = [], []
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if session is not None:
+            clauses.append("session = ?")
+            params.append(str(session))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def list(self, kind: str | None = "pdf", session: str | None = None,
+             limit: int | None = None) -> list[dict]:
+        """Indexed outputs, newest first.
+
+        Args:
+            kind: File extension to list (``None`` for all files)
+            session: Only outputs recorded for this session
+            limit: Maximum number of entries
+
+        Returns:
+            ``{"name", "path", "kind", "size", "mtime", "session"}`` dicts
+        """
+        self._refresh()
+        where, params = self._where(kind, session)
+        sql = f"SELECT name, kind, size, mtime, session FROM outputs{where} ORDER BY mtime DESC, name DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"name": name, "path": str(self.directory / name), "kind": kind,
+             "size": size, "mtime": mtime, "session": session}
+            for name, kind, size, mtime, session in rows
+        ]
+
+    def count(self, kind: str | None = "pdf", session: str | None = None) -> int:
+        """Number of indexed outputs (same filters as ``list``)."""
+        self._refresh()
+        where, params = self._where(kind, session)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM outputs{where}", params).fetchone()[0]
+
+
+@lru_cache(maxsize=OUTPUT_READ_CACHE_SIZE)
+def read_bytes(path: str, mtime: float) -> bytes:
+    """Contents of ``path``; ``mtime`` is part of the cache key so edits are seen."""
+    started = time.perf_counter()
+    data = Path(path).read_bytes()
+    print(f"Read {len(data)} bytes from {path} in {time.perf_counter() - started:.3f}s")
+    return data
+
+
+output_index = OutputIndex()
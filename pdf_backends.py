@@ -0,0 +1,115 @@
+# Interchangeable PDF text extraction engines used by read_pdf
+import importlib
+import importlib.util
+import io
+import os
+
+# Extraction engine: pypdf (default), pypdf2 or pdfminer (pdfminer.six, slower
+# but follows two-column layouts); compare them with
+# benchmarks/bench_pdf_backends.py
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pypdf").lower()
+
+
+class PdfBackend:
+    """A PDF text extraction engine.
+
+    ``open`` parses a document once and returns a handle; ``page_count`` and
+    ``page_text`` work on that handle, so pages can be extracted lazily or split
+    across worker processes. The engine itself is imported on first use.
+    """
+
+    name = None
+    # Module to import and the package that provides it
+    module = None
+    package = None
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    def _import(self):
+        try:
+            return importlib.import_module(self.module)
+        except ImportError as e:
+            raise ImportError(
+                f"PDF_BACKEND={self.name} needs the {self.package} package (pip install {self.package})"
+            ) from e
+
+    def open(self, pdf_data: bytes):
+        raise NotImplementedError
+
+    def page_count(self, document) -> int:
+        raise NotImplementedError
+
+    def page_text(self, document, index: int) -> str:
+        raise NotImplementedError
+
+
+class PypdfBackend(PdfBackend):
+    """pypdf, the maintained successor of PyPDF2."""
+
+    name = "pypdf"
+    module = "pypdf"
+    package = "pypdf"
+
+    def open(self, pdf_data: bytes):
+        return self._import().PdfReader(io.BytesIO(pdf_data))
+
+    def page_count(self, document) -> int:
+        return len(document.pages)
+
+    def page_text(self, document, index: int) -> str:
+        return document.pages[index].extract_text() or ""
+
+
+class PyPDF2Backend(PypdfBackend):
+    """PyPDF2, deprecated; kept for comparison and existing installs."""
+
+    name = "pypdf2"
+    module = "PyPDF2"
+    package = "PyPDF2"
+
+
+class PdfminerBackend(PdfBackend):
+    """pdfminer.six layout analysis: reads multi-column pages column by column."""
+
+    name = "pdfminer"
+    module = "pdfminer"
+    package = "pdfminer.six"
+
+    def open(self, pdf_data: bytes):
+        self._import()
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        document = PDFDocument(PDFParser(io.BytesIO(pdf_data)))
+        return list(PDFPage.create_pages(document))
+
+    def page_count(self, document) -> int:
+        return len(document)
+
+    def page_text(self, document, index: int) -> str:
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+
+        out = io.StringIO()
+        resources = PDFResourceManager()
+        device = TextConverter(resources, out, laparams=LAParams())
+        try:
+            PDFPageInterpreter(resources, device).process_page(document[index])
+        finally:
+            device.close()
+        return out.getvalue()
+
+
+BACKENDS = {backend.name: backend for backend in (PypdfBackend(), PyPDF2Backend(), PdfminerBackend())}
+
+
+def get_backend(name: str | None = None) -> PdfBackend:
+    """The backend called ``name``, defaulting to ``PDF_BACKEND``."""
+    name = (name or PDF_BACKEND).lower()
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF backend {name!r}; choose one of {', '.join(BACKENDS)}") from None
@@ -0,0 +1,255 @@
+# Content-addressed store for downloaded PDFs and their extracted text
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import http_client
+import tracing
+from disk_cache import CACHE_DIR
+
+# arxiv.org/abs/X, arxiv.org/pdf/X, arxiv.org/pdf/X.pdf, export.arxiv.org/... ;
+# X is either a new-style id (2401.01234) or an old-style one (hep-th/9901001)
+ARXIV_URL_RE = re.compile(
+    r"arxiv\.org/(?:abs|pdf)/"
+    r"(?P<id>\d{4}\.\d{4,5}|[a-z][a-z\-]*(?:\.[A-Za-z]{2})?/\d{7})"
+    r"(?P<version>v\d+)?",
+    re.IGNORECASE,
+)
+
+
+def parse_arxiv_url(url: str):
+    """Return ``(arxiv_id, version)`` for an arXiv URL, or ``None`` otherwise.
+
+    ``version`` is ``None`` when the URL points at the latest version.
+    """
+    match = ARXIV_URL_RE.search(url)
+    if match is None:
+        return None
+    return match.group("id").lower(), match.group("version")
+
+
+def document_key(url: str) -> str:
+    """Canonical cache key for a PDF URL.
+
+    All spellings of the same arXiv paper share a key (``arxiv:2401.01234v2``);
+    other URLs are keyed by the URL itself.
+    """
+    parsed = parse_arxiv_url(url)
+    if parsed is None:
+        return "url:" + url.strip()
+    arxiv_id, version = parsed
+    return f"arxiv:{arxiv_id}{version or ''}"
+
+
+class PdfStore:
+    """Local PDF cache with a byte budget and LRU eviction.
+
+    Blobs (raw PDF bytes and extracted text) are stored under their SHA-256, so
+    two keys that resolve to the same file share storage. A small SQLite index
+    maps document keys to blobs together with the validators (ETag,
+    Last-Modified) needed for conditional revalidation.
+
+    Versioned arXiv URLs never change and are served from disk without touching
+    the network. Everything else is revalidated with a conditional GET once it
+    is older than ``revalidate_after`` seconds.
+    """
+
+    def __init__(self, root=None, max_bytes=500 * 1024 * 1024, revalidate_after=24 * 60 * 60):
+        self.root = root or CACHE_DIR / "pdfs"
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " key TEXT PRIMARY KEY,"
+            " sha256 TEXT NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " name TEXT PRIMARY KEY,"
+            " sha256 TEXT NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    # Blob helpers
+    def _blob_path(self, name):
+        return self.blob_dir / name[:2] / name
+
+    def _write_blob(self, name, sha, data: bytes):
+        path = self._blob_path(name)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO blobs (name, sha256, size) VALUES (?, ?, ?)",
+            (name, sha, len(data)),
+        )
+
+    def _read_blob(self, name):
+        try:
+            return self._blob_path(name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    # Public API
+    def _lookup(self, url: str):
+        """Find ``url`` in the cache.
+
+        Returns ``(key, cached, headers)`` where ``cached`` is ``(sha, data)`` or
+        ``None`` and ``headers`` holds the conditional-GET validators, or is
+        ``None`` when the cached copy is fresh and no request is needed.
+        """
+        key = document_key(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, etag, last_modified, fetched_at FROM documents WHERE key = ?",
+                (key,),
+            ).fetchone()
+        data = self._read_blob(row[0]) if row else None
+        if data is None:
+            return key, None, {}
+
+        sha, etag, last_modified, fetched_at = row
+        immutable = key.startswith("arxiv:") and parse_arxiv_url(url)[1] is not None
+        if immutable or time.time() - fetched_at < self.revalidate_after:
+            self.hits += 1
+            tracing.add(cache_hits=1)
+            self._touch(key)
+            return key, (sha, data), None
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        self.revalidations += 1
+        return key, (sha, data), headers
+
+    def _not_modified(self, key):
+        print(f"PDF not modified, using cached copy of {key}")
+        self.hits += 1
+        tracing.add(cache_hits=1)
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE documents SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key),
+            )
+            self._conn.commit()
+
+    def _save(self, key, data: bytes, headers) -> str:
+        self.misses += 1
+        tracing.add(cache_misses=1)
+        sha = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            self._write_blob(sha, sha, data)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents"
+                " (key, sha256, etag, last_modified, fetched_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, sha, headers.get("ETag"), headers.get("Last-Modified"), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+        return sha
+
+    def get_pdf(self, url: str) -> tuple[str, bytes]:
+        """Return ``(sha256, pdf_bytes)`` for ``url``, downloading only if needed."""
+        key, cached, headers = self._lookup(url)
+        if headers is None:
+            return cached
+        response = http_client.get(url, headers=headers)
+        if cached is not None and response.status_code == 304:
+            self._not_modified(key)
+            return cached
+        response.raise_for_status()
+        return self._save(key, response.content, response.headers), response.content
+
+    async def aget_pdf(self, url: str) -> tuple[str, bytes]:
+        """Async version of ``get_pdf``."""
+        key, cached, headers = self._lookup(url)
+        if headers is None:
+            return cached
+        response = await http_client.aget(url, headers=headers)
+        if cached is not None and response.status_code == 304:
+            self._not_modified(key)
+            return cached
+        response.raise_for_status()
+        return self._save(key, response.content, response.headers), response.content
+
+    @staticmethod
+    def _text_blob(sha: str, backend: str) -> str:
+        # Each extraction backend produces different text, so each has its own copy
+        return f"{sha}.{backend}.txt" if backend else f"{sha}.txt"
+
+    def get_text(self, sha: str, backend: str = ""):
+        """Return the cached text extracted by ``backend`` from the PDF with this hash, if any."""
+        data = self._read_blob(self._text_blob(sha, backend))
+        return None if data is None else data.decode("utf-8")
+
+    def put_text(self, sha: str, text: str, backend: str = ""):
+        """Store the extracted text next to the PDF it was extracted from."""
+        with self._lock:
+            self._write_blob(self._text_blob(sha, backend), sha, text.encode("utf-8"))
+            self._evict()
+            self._conn.commit()
+
+    def _touch(self, key):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used documents until the blobs fit the budget.
+        # A blob is only deleted once no remaining document references it.
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        docs = self._conn.execute(
+            "SELECT key, sha256 FROM documents ORDER BY accessed_at ASC"
+        ).fetchall()
+        for key, sha in docs[:-1]:  # never evict the document just written
+            self._conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+            still_used = self._conn.execute(
+                "SELECT 1 FROM documents WHERE sha256 = ? LIMIT 1", (sha,)
+            ).fetchone()
+            if still_used:
+                continue
+            for name, size in self._conn.execute(
+                "SELECT name, size FROM blobs WHERE sha256 = ?", (sha,)
+            ).fetchall():
+                self._blob_path(name).unlink(missing_ok=True)
+                total -= size
+            self._conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha,))
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "documents": documents,
+            "bytes": total,
+        }
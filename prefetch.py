@@ -0,0 +1,140 @@
+# Speculative background reads of the papers a search just returned
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import tracing
+from pdf_cache import document_key
+
+# How many of the top search results to download and extract in the
+# background (0 disables prefetching)
+PDF_PREFETCH_TOP_K = int(os.getenv("PDF_PREFETCH_TOP_K", 0))
+# Background prefetches running at once; downloads still go through the
+# per-host rate limits of http_client
+PDF_PREFETCH_WORKERS = int(os.getenv("PDF_PREFETCH_WORKERS", 2))
+
+
+class Prefetcher:
+    """Runs ``fetch(url)`` at most once at a time per document.
+
+    ``prefetch`` starts fetches in a small background pool; ``get``/``aget``
+    join the fetch already in flight for the same document (same
+    ``document_key``) instead of starting a duplicate, or run it themselves.
+    Finished fetches are dropped from the table, since their results are in
+    the PDF and text caches by then.
+
+    Args:
+        fetch: Function doing the work for one URL, e.g. download and extract
+        workers: Size of the background pool
+        top_k: How many URLs ``prefetch`` starts per call
+    """
+
+    def __init__(self, fetch, workers: int = PDF_PREFETCH_WORKERS, top_k: int = PDF_PREFETCH_TOP_K):
+        self.fetch = fetch
+        self.top_k = top_k
+        self.started = 0
+        self.joined = 0
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="prefetch")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, url: str):
+        """``(key, future, owner)``: the in-flight future for ``url``, or a new one the caller must run."""
+        key = document_key(url)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return key, future, False
+            future = self._inflight[key] = Future()
+            return key, future, True
+
+    def _settle(self, key, future: Future, result=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None and not isinstance(error, Exception):
+            # A cancelled owner should make waiters retry, not cancel them too
+            error = RuntimeError(f"Read of {key} was interrupted")
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def _run(self, key, future: Future, url: str):
+        try:
+            result = self.fetch(url)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    def prefetch(self, urls) -> int:
+        """Start background fetches of the first ``top_k`` URLs; returns how many were started."""
+        count = 0
+        for url in list(urls)[:self.top_k]:
+            key, future, owner = self._claim(url)
+            if owner:
+                self._pool.submit(self._run, key, future, url)
+                count += 1
+        self.started += count
+        if count:
+            print(f"Prefetching {count} PDF(s) in the background")
+        return count
+
+    def get(self, url: str):
+        """``fetch(url)``, waiting for an in-flight fetch of the same document if there is one."""
+        key, future, owner = self._claim(url)
+        if not owner:
+            self.joined += 1
+            tracing.add(cache_hits=1)
+            print(f"Waiting for the in-flight read of {key}")
+            try:
+                return future.result()
+            except Exception:
+                # A failed prefetch must not fail the read; try again ourselves
+                key, future, owner = self._claim(url)
+                if not owner:
+                    return future.result()
+        return self._run(key, future, url)
+
+    def wait(self, url: str) -> bool:
+        """Wait for an in-flight fetch of ``url``'s document, if any; returns True if there was one.
+
+        For readers that need something other than ``fetch``'s result but
+        would download the same PDF: once this returns, the PDF is cached.
+        Errors are left to the caller's own attempt.
+        """
+        with self._lock:
+            future = self._inflight.get(document_key(url))
+        if future is None:
+            return False
+        self.joined += 1
+        tracing.add(cache_hits=1)
+        print(f"Waiting for the in-flight read of {document_key(url)}")
+        try:
+            future.result()
+        except Exception:
+            pass
+        return True
+
+    async def aget(self, url: str, afetch):
+        """Async ``get``; runs ``await afetch(url)`` when nothing is in flight."""
+        key, future, owner = self._claim(url)
+        if not owner:
+            self.joined += 1
+            tracing.add(cache_hits=1)
+            print(f"Waiting for the in-flight read of {key}")
+            try:
+                # Shielded: a cancelled waiter must not cancel the shared fetch
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except Exception:
+                key, future, owner = self._claim(url)
+                if not owner:
+                    return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await afetch(url)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
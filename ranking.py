@@ -0,0 +1,103 @@
+# Relevance ranking and near-duplicate removal for arXiv search results
+import re
+from dataclasses import replace
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this"
+    " to was we were which with our these their using via into can not".split()
+)
+
+
+def _tokenize(text: str) -> list[str]:
+    return [w for w in re.findall(r"[a-z0-9]{2,}", text.lower()) if w not in STOP_WORDS]
+
+
+def tfidf_matrix(documents: list[str], extra: list[str] = ()):
+    """Build an L2-normalized TF-IDF matrix.
+
+    Args:
+        documents: Texts that make up the corpus (one row each)
+        extra: Texts projected into the same space (e.g. the query), which do
+            not contribute to document frequencies
+
+    Returns:
+        ``(doc_matrix, extra_matrix)`` as float arrays with one row per text
+    """
+    # numpy is only needed once a search is ranked, not at start-up
+    import numpy as np
+
+    tokenized = [_tokenize(doc) for doc in documents]
+    tokenized_extra = [_tokenize(doc) for doc in extra]
+    vocab = {}
+    for tokens in tokenized + tokenized_extra:
+        for token in tokens:
+            vocab.setdefault(token, len(vocab))
+
+    def counts(rows):
+        matrix = np.zeros((len(rows), len(vocab)))
+        for i, tokens in enumerate(rows):
+            if tokens:
+                np.add.at(matrix[i], [vocab[t] for t in tokens], 1.0)
+        return matrix
+
+    docs = counts(tokenized)
+    df = np.count_nonzero(docs, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1.0
+
+    def weigh(matrix):
+        matrix = np.log1p(matrix) * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    return weigh(docs), weigh(counts(tokenized_extra))
+
+
+def rank_papers(query: str, entries: list, top_k: int,
+                duplicate_threshold: float = 0.8) -> list:
+    """Order search results by relevance to ``query`` and drop near-duplicates.
+
+    Titles and summaries are embedded with TF-IDF and scored by cosine
+    similarity to the query. Walking the entries from best to worst, any entry
+    with the same arXiv ID as an already kept one, or whose similarity to a
+    kept entry is at least ``duplicate_threshold``, is folded into it (its ID
+    is listed under ``duplicates``).
+
+    Args:
+        query: The search topic
+        entries: ``Paper`` records from ``parse_arxiv_xml``
+        top_k: Number of entries to return
+        duplicate_threshold: Cosine similarity above which two entries are
+            considered the same work
+
+    Returns:
+        At most ``top_k`` copies of the entries, best first, each with its
+        ``relevance`` score set
+    """
+    import numpy as np
+
+    if not entries:
+        return []
+    # Titles are counted twice so they weigh more than the abstract
+    texts = [f"{e.title or ''} {e.title or ''} {e.summary or ''}" for e in entries]
+    docs, queries = tfidf_matrix(texts, [query])
+    scores = docs @ queries[0]
+    similarity = docs @ docs.T
+
+    kept = []
+    ranked = []
+    for i in np.argsort(-scores, kind="stable"):
+        entry = entries[i]
+        owner = next(
+            (k for k in kept
+             if entries[k].id == entry.id or similarity[i, k] >= duplicate_threshold),
+            None,
+        )
+        if owner is not None:
+            paper = ranked[kept.index(owner)]
+            paper.duplicates = (paper.duplicates or []) + [entry.id]
+            continue
+        if len(kept) == top_k:
+            continue
+        kept.append(i)
+        ranked.append(replace(entry, relevance=round(float(scores[i]), 3)))
+    return ranked
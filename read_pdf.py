@@ -1,7 +1,235 @@
 from langchain_core.tools import tool
-import io
-import PyPDF2
-import requests
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import multiprocessing
+import os
+import threading
+from library import library
+from pdf_backends import PdfBackend, get_backend
+from pdf_cache import PdfStore, document_key
+from prefetch import Prefetcher
+import tracing
+
+# Raw PDFs and extracted text are kept on disk between calls and sessions
+pdf_store = PdfStore(
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", 500 * 1024 * 1024)),
+    revalidate_after=int(os.getenv("PDF_CACHE_REVALIDATE", 24 * 60 * 60)),
+)
+
+# Text extraction engine, chosen with PDF_BACKEND
+pdf_backend = get_backend()
+
+# Page extraction is CPU bound, so large documents are split across processes
+PDF_WORKERS = int(os.getenv("READ_PDF_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_PAGES = int(os.getenv("READ_PDF_PARALLEL_MIN_PAGES", 16))
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return a process pool with ``workers`` processes, reused across calls."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Workers come from a fork server, not from forking this process:
+            # its other threads (jobs, prefetch, tracing) may hold locks that a
+            # forked child would inherit locked
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+            _pool_workers = workers
+        return _pool
+
+
+def _drop_pool(pool: ProcessPoolExecutor):
+    """Forget ``pool`` after a worker died, so the next call starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _extract_page_range(backend_name: str, pdf_data: bytes, start: int, stop: int) -> list[str]:
+    """Extract pages ``start``..``stop - 1``; runs inside a worker process."""
+    backend = get_backend(backend_name)
+    document = backend.open(pdf_data)
+    return [backend.page_text(document, i) for i in range(start, stop)]
+
+
+def extract_pages(pdf_data: bytes, workers: int | None = None,
+                  backend: PdfBackend | None = None) -> list[str]:
+    """Extract the text of every page of a PDF, in page order.
+
+    Documents with fewer than ``PARALLEL_MIN_PAGES`` pages (or ``workers <= 1``)
+    are extracted serially; larger ones are split into one contiguous page
+    range per worker and extracted in a process pool. If a worker process
+    dies, the document is extracted serially and the next call starts a new
+    pool.
+
+    Args:
+        pdf_data: Raw PDF bytes
+        workers: Number of worker processes, defaults to ``PDF_WORKERS``
+        backend: Extraction engine, defaults to ``pdf_backend``
+
+    Returns:
+        One string per page
+    """
+    workers = PDF_WORKERS if workers is None else workers
+    backend = backend or pdf_backend
+    document = backend.open(pdf_data)
+    num_pages = backend.page_count(document)
+
+    if workers > 1 and num_pages >= PARALLEL_MIN_PAGES:
+        workers = min(workers, num_pages)
+        chunk = -(-num_pages // workers)
+        print(f"Extracting text from {num_pages} pages with {backend.name} and {workers} workers")
+        pool = _get_pool(workers)
+        try:
+            futures = [
+                pool.submit(_extract_page_range, backend.name, pdf_data, start, min(start + chunk, num_pages))
+                for start in range(0, num_pages, chunk)
+            ]
+            return [text for future in futures for text in future.result()]
+        except BrokenProcessPool as e:
+            print(f"PDF worker pool broke ({e}); extracting serially")
+            _drop_pool(pool)
+
+    print(f"Extracting text from {num_pages} pages with {backend.name}")
+    return [backend.page_text(document, i) for i in range(num_pages)]
+
+
+def extract_text(pdf_data: bytes, workers: int | None = None,
+                 backend: PdfBackend | None = None) -> str:
+    """Extract the text of every page of a PDF joined by newlines."""
+    return "\n".join(extract_pages(pdf_data, workers, backend)).strip()
+
+
+def iter_pdf_pages(pdf_data: bytes, start: int = 0, stop: int | None = None, document=None):
+    """Lazily yield ``(page_index, text)`` for pages ``start``..``stop - 1``.
+
+    Pages are only parsed when the caller asks for them, so stopping early
+    skips the extraction work for the rest of the document. Pass the
+    ``document`` handle from ``pdf_backend.open`` to avoid parsing it again.
+    """
+    document = pdf_backend.open(pdf_data) if document is None else document
+    num_pages = pdf_backend.page_count(document)
+    stop = num_pages if stop is None else min(stop, num_pages)
+    for i in range(max(start, 0), stop):
+        yield i, pdf_backend.page_text(document, i)
+
+
+@tool
+def read_pdf_pages(url: str, start_page: int = 1, end_page: int | None = None,
+                   max_chars: int = 20000) -> str:
+    """Read part of a PDF, page by page, up to a character budget.
+
+    Use this instead of read_pdf to skim the first pages of a paper, then call
+    it again with a later start_page to continue where the previous call stopped.
+    Roughly 4 characters make one token.
+
+    Args:
+        url: The URL of the PDF file to read
+        start_page: First page to read (1-based)
+        end_page: Last page to read (inclusive), defaults to the last page
+        max_chars: Stop reading once this many characters have been extracted
+
+    Returns:
+        The text of the pages read, followed by a note saying which pages were
+        read and how many pages remain
+    """
+    try:
+        # A prefetch of this paper may be downloading it right now; reuse it
+        prefetcher.wait(url)
+        _, pdf_data = pdf_store.get_pdf(url)
+        document = pdf_backend.open(pdf_data)
+        num_pages = pdf_backend.page_count(document)
+        if not 1 <= start_page <= num_pages:
+            print(f"start_page={start_page} is outside the {num_pages} pages of {url}")
+            return f"[Nothing read: start_page={start_page}, but the PDF has pages 1-{num_pages}.]"
+        if end_page is not None and end_page < start_page:
+            return f"[Nothing read: end_page={end_page} is before start_page={start_page}.]"
+        read = []
+        stop = num_pages if end_page is None else min(end_page, num_pages)
+
+        parts = []
+        used = 0
+        last_page = start_page - 1
+        partial = None
+        for i, text in iter_pdf_pages(pdf_data, start_page - 1, stop, document):
+            if parts and used + len(text) > max_chars:
+                break
+            # The library gets the whole page even when the reply only shows part of it
+            read.append((i + 1, text))
+            if len(text) > max_chars:
+                # Only a page longer than the whole budget is cut, and only when it comes first
+                partial = (i + 1, max_chars, len(text))
+                text = text[:max_chars]
+            parts.append(f"[Page {i + 1}]\n{text}")
+            used += len(text)
+            last_page = i + 1
+            if used >= max_chars:
+                break
+
+        tracing.add(pages=len(read))
+        library.add_pages(document_key(url), url, read, num_pages)
+        remaining = num_pages - last_page
+        note = f"[Read pages {start_page}-{last_page} of {num_pages}"
+        if partial is not None:
+            note += f" (page {partial[0]} only partially: its first {partial[1]} of {partial[2]} characters)"
+        note += f"; {remaining} pages remaining"
+        if partial is not None:
+            note += ". Call read_pdf_pages with a larger max_chars to read the whole page"
+        if last_page < stop:
+            note += f". Call read_pdf_pages with start_page={last_page + 1} to continue"
+        note += ".]"
+        print(f"Read pages {start_page}-{last_page} of {num_pages} ({used} characters)")
+        return "\n".join(parts + [note])
+    except Exception as e:
+        print(f"Error reading PDF: {str(e)}")
+        raise
+
+
+def _pdf_text(url: str, sha: str, pdf_data: bytes) -> str:
+    """Return the cached text of a downloaded PDF, extracting it if needed."""
+    key = document_key(url)
+    text = pdf_store.get_text(sha, pdf_backend.name)
+    if text is not None:
+        print(f"Using cached text for {url} ({len(text)} characters)")
+        tracing.add(cache_hits=1)
+        if library.has(key):
+            return text
+        # Text cached before the paper was indexed (or the library was reset);
+        # the cached text has no page breaks, so extract the pages again
+        print(f"{key} is missing from the library; indexing it")
+
+    pages = extract_pages(pdf_data)
+    tracing.add(pages=len(pages))
+    if text is None:
+        text = "\n".join(pages).strip()
+        print(f"Successfully extracted {len(text)} characters of text from PDF")
+        pdf_store.put_text(sha, text, pdf_backend.name)
+    library.add_pages(key, url, enumerate(pages, 1), len(pages))
+    return text
+
+
+def _read_text(url: str) -> str:
+    sha, pdf_data = pdf_store.get_pdf(url)
+    return _pdf_text(url, sha, pdf_data)
+
+
+async def _aread_text(url: str) -> str:
+    sha, pdf_data = await pdf_store.aget_pdf(url)
+    return await asyncio.to_thread(_pdf_text, url, sha, pdf_data)
+
+
+# Reads of the same document share one download and extraction, whether they
+# come from the agent or from the speculative prefetch after arxiv_search
+prefetcher = Prefetcher(_read_text)
+
 
 @tool
 def read_pdf(url: str) -> str:
@@ -14,17 +242,20 @@ def read_pdf(url: str) -> str:
         The extracted text content from the PDF
     """
     try:
-        response = requests.get(url)
-        pdf_file = io.BytesIO(response.content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        num_pages = len(pdf_reader.pages)
-        text = ""
-        for i, page in enumerate(pdf_reader.pages, 1):
-            print(f"Extracting text from page {i}/{num_pages}")
-            text += page.extract_text() + "\n"
+        return prefetcher.get(url)
+    except Exception as e:
+        print(f"Error reading PDF: {str(e)}")
+        raise
 
-        print(f"Successfully extracted {len(text)} characters of text from PDF")
-        return text.strip()
+
+async def aread_pdf(url: str) -> str:
+    """Async read_pdf: awaits the download and extracts in a worker thread, so
+    several PDFs requested in one turn are fetched and parsed concurrently."""
+    try:
+        return await prefetcher.aget(url, _aread_text)
     except Exception as e:
         print(f"Error reading PDF: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+read_pdf.coroutine = aread_pdf
@@ -0,0 +1,224 @@
+# Agent graph shared by the CLI (ai_researcher2.py) and the web app (app.py)
+import os
+import threading
+import uuid
+from typing import Annotated, Literal
+from typing_extensions import TypedDict
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-flash-lite-latest")
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+INITIAL_PROMPT = r"""
+You are an expert researcher in the fields of physics, mathematics,
+computer science, quantitative biology, quantitative finance, statistics,
+electrical engineering and systems science, and economics.
+
+You are going to analyze recent research papers in one of these fields in
+order to identify promising new research directions and then write a new
+research paper. For research information or getting papers, ALWAYS use arxiv.org.
+You will use the tools provided to search for papers, read them, and write a new
+paper based on the ideas you find.
+
+RESEARCH WORKFLOW - Follow this sequence intelligently:
+1. **Topic Discovery**: Have a brief conversation to understand the research topic
+2. **Literature Review**: Search arXiv for relevant recent papers on the topic
+3. **Paper Analysis**: Read 1-2 key papers to understand current research
+4. **Idea Generation**: Identify gaps and propose 2-3 specific research directions
+5. **Paper Writing**: Write the research paper with mathematical formulations
+6. **PDF Generation**: Render the final paper as LaTeX PDF
+
+SMART DECISION MAKING RULES:
+- You MAY autonomously proceed through the research workflow steps when the context clearly indicates it's the logical next step
+- You MUST wait for explicit user confirmation before:
+  * Searching arXiv (but you can suggest specific search queries)
+  * Reading specific PDFs (but you can recommend which papers to read)
+  * Writing the full paper (but you can outline the structure)
+  * Rendering LaTeX (but you can show sample equations)
+- When the user gives a clear directive (e.g., "write the paper", "search for X", "read this"), proceed with that action immediately
+- After completing a major step, briefly summarize what was accomplished and suggest the next logical step
+- If the user provides minimal responses (like "yes", "no", numbers), interpret them in context and proceed logically
+- For mathematical papers, automatically include relevant equations in your discussions
+- When referencing papers, always try to provide arXiv links if available
+
+TOOL USAGE GUIDELINES:
+- Use arxiv_search when you need to find recent papers on a specific topic
+- Use arxiv_batch_search instead of several arxiv_search calls when you need papers on multiple related topics
+- Use read_pdf when you need to analyze the content of a specific paper
+- Use read_pdf_pages to skim the first pages of a paper, and continue with later pages only if needed
+- Use search_library to answer follow-up questions about papers that were already read instead of reading them again
+- Use render_latex_pdf when the paper content is complete and ready for final formatting
+- If render_latex_pdf reports LaTeX errors, fix every listed line and call it again with the corrected document
+
+CONVERSATION STYLE:
+- Be concise and focused on research progress
+- Minimize unnecessary questions when the intent is clear
+- Provide clear options rather than open-ended questions
+- After user confirms a direction, proceed with the next logical step
+
+CRITICAL CONSTRAINTS:
+- NEVER search or read without user confirmation for the specific action
+- ALWAYS respect the user's explicit instructions
+- NEVER proceed to write the full paper without clear user confirmation
+- ALWAYS ensure mathematical rigor in technical discussions
+
+Now, let's begin our research collaboration. What topic would you like to explore for our paper?
+"""
+
+
+def get_tools() -> list:
+    """The research tools, in the order they are offered to the model."""
+    from arxiv_tool import arxiv_search, arxiv_batch_search
+    from read_pdf import read_pdf, read_pdf_pages
+    from library import search_library
+    from write_pdf import render_latex_pdf
+    return [arxiv_search, arxiv_batch_search, read_pdf, read_pdf_pages, search_library, render_latex_pdf]
+
+
+def create_model(model_name: str = MODEL_NAME):
+    """Gemini chat model; ``langchain_google_genai`` is imported only here."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model_name, api_key=os.getenv("GEMINI_API_KEY"))
+
+
+class LazyModel:
+    """Creates and binds the chat model on the first call.
+
+    Importing and configuring the Gemini client is the slowest part of start-up,
+    so the graph is built without it and the model is only created when the
+    agent first needs to answer. The bound model is wrapped with the response
+    cache from ``llm_cache.py`` when ``LLM_CACHE_MODE`` is record or replay.
+    """
+
+    def __init__(self, tools, model=None, model_name: str = MODEL_NAME):
+        self.tools = tools
+        self.model = model
+        self.model_name = model_name
+        self._bound = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        """Model name used in traces."""
+        if self.model is None:
+            return self.model_name
+        return getattr(self.model, "model", None) or type(self.model).__name__
+
+    def get(self):
+        if self._bound is None:
+            with self._lock:
+                if self._bound is None:
+                    import llm_cache
+
+                    model = self.model if self.model is not None else create_model(self.model_name)
+                    self._bound = llm_cache.wrap(model.bind_tools(self.tools), self.tools, self.name)
+        return self._bound
+
+
+def _unwrap_response(response):
+    """
+    Normalize Gemini responses to a LangChain-standard dict:
+    { role: "assistant", content: "...", tool_calls: [...] }
+    """
+    # If Gemini returns a normal AIMessage, extract fields
+    role = getattr(response, "role", "assistant")
+    content = getattr(response, "content", None)
+    tool_calls = getattr(response, "tool_calls", None)
+
+    # content can be list (Gemini) → extract text
+    if isinstance(content, list):
+        # convert Gemini content list → plain string
+        text = ""
+        for block in content:
+            if isinstance(block, dict) and block.get("text"):
+                text += block["text"] + "\n"
+        content = text.strip()
+
+    # fallback
+    if content is None:
+        content = ""
+
+    # A stable ID lets add_messages recognize this message if it is sent again
+    msg = {
+        "role": role,
+        "content": content,
+        "id": getattr(response, "id", None) or str(uuid.uuid4()),
+    }
+
+    if tool_calls:
+        msg["tool_calls"] = tool_calls
+
+    return msg
+
+
+def should_continue(state: State) -> Literal["tools", END]:
+    messages = state["messages"]
+    last_message = messages[-1]
+
+    # Check if the last message is an AIMessage with tool_calls
+    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+        return "tools"
+    # Also check if it's a dictionary with tool_calls (for normalized messages)
+    elif isinstance(last_message, dict) and last_message.get("tool_calls"):
+        return "tools"
+    return END
+
+
+def build_graph(model=None, checkpointer=None, tools=None):
+    """Build the agent/tools graph.
+
+    Args:
+        model: Chat model to use (unbound); defaults to Gemini ``MODEL_NAME``,
+            created on the first model call
+        checkpointer: LangGraph checkpointer; defaults to the pruned SQLite
+            checkpointer from ``checkpointer.py``
+        tools: Tools offered to the model, defaults to ``get_tools()``
+
+    Returns:
+        The compiled graph
+    """
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.prebuilt import ToolNode
+    from context import compact_messages
+    import tracing
+
+    tools = get_tools() if tools is None else tools
+    lazy_model = LazyModel(tools, model)
+
+    def call_model(state: State):
+        messages = state.get("messages", [])
+        # LLM call on a compacted copy of the history; the state keeps everything
+        with tracing.span("model", lazy_model.name) as span:
+            response = lazy_model.get().invoke(compact_messages(messages))
+            tracing.record_usage(span, response)
+        # Return only the new message; add_messages appends it to the history
+        return {"messages": [_unwrap_response(response)]}
+
+    async def acall_model(state: State):
+        with tracing.span("model", lazy_model.name) as span:
+            response = await lazy_model.get().ainvoke(compact_messages(state.get("messages", [])))
+            tracing.record_usage(span, response)
+        return {"messages": [_unwrap_response(response)]}
+
+    workflow = StateGraph(State)
+    # Sync graph.stream uses call_model, graph.astream uses acall_model
+    workflow.add_node("agent", RunnableLambda(call_model, acall_model, name="agent"))
+    # Every tool call is traced (wall time, bytes, pages, cache hits)
+    workflow.add_node("tools", ToolNode(
+        tools, wrap_tool_call=tracing.wrap_tool_call, awrap_tool_call=tracing.awrap_tool_call,
+    ))
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges("agent", should_continue, {"tools": "tools", END: END})
+    # return from tools back to agent
+    workflow.add_edge("tools", "agent")
+
+    if checkpointer is None:
+        # Checkpoints live on disk, so conversations survive restarts
+        from checkpointer import create_checkpointer
+        checkpointer = create_checkpointer()
+    return workflow.compile(checkpointer=checkpointer)
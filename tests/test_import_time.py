@@ -0,0 +1,10 @@
+import pytest
+
+from benchmarks.bench_import_time import MODULES, import_profile
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_heavy_dependencies_are_imported_lazily(module, tmp_path):
+    total, _, eager = import_profile(module, str(tmp_path))
+    assert total > 0
+    assert eager == []
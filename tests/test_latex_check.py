@@ -0,0 +1,55 @@
+from latex_check import ERROR, WARNING, validate_latex
+
+PREAMBLE = "\\documentclass{article}\n\\usepackage{listings}\n\\begin{document}\n"
+END = "\n\\end{document}\n"
+
+
+def errors(body: str) -> list[dict]:
+    return [i for i in validate_latex(PREAMBLE + body + END) if i["severity"] == ERROR]
+
+
+def test_valid_document_has_no_issues():
+    assert validate_latex(PREAMBLE + "Euler: $e^{i\\pi} + 1 = 0$." + END) == []
+
+
+def test_verb_brace_is_not_an_error():
+    assert validate_latex(PREAMBLE + "Type \\verb|{| to open a group." + END) == []
+
+
+def test_verb_dollar_is_not_math():
+    assert validate_latex(PREAMBLE + "Costs \\verb+$+5 and \\verb*!$$! too." + END) == []
+
+
+def test_verb_percent_is_not_a_comment():
+    assert validate_latex(PREAMBLE + "Use \\verb|%| then {bold}." + END) == []
+
+
+def test_lstinline_is_skipped():
+    assert validate_latex(PREAMBLE + "Call \\lstinline[language=C]!f({)!." + END) == []
+
+
+def test_verbatim_environments_are_skipped():
+    body = ("\\begin{verbatim}\nif (x) { $y\n\\end{verbatim}\n"
+            "\\begin{lstlisting}[language=Python]\nd = {'a': '$'\n\\end{lstlisting}")
+    assert validate_latex(PREAMBLE + body + END) == []
+
+
+def test_unbalanced_brace_is_an_error():
+    issues = errors("\\textbf{never closed")
+    assert [i["message"] for i in issues] == ["'{' is never closed"]
+    assert issues[0]["line"] == 4
+
+
+def test_mismatched_environment_is_an_error():
+    assert any("does not match" in i["message"] for i in errors("\\begin{itemize}\n\\end{enumerate}"))
+
+
+def test_missing_document_is_an_error():
+    issues = validate_latex("\\documentclass{article}\nHello")
+    assert {"line": None, "message": "missing \\begin{document}", "severity": ERROR} in issues
+
+
+def test_heuristics_are_warnings():
+    issues = validate_latex(PREAMBLE + "Sets $\\mathbb{R}$ and $x." + END)
+    assert issues
+    assert all(i["severity"] == WARNING for i in issues)
@@ -0,0 +1,197 @@
+# Per-step instrumentation of the agent/tools loop
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from disk_cache import CACHE_DIR
+
+TRACE_DIR = Path(os.getenv("TRACE_DIR", str(CACHE_DIR / "traces")))
+# Set TRACING=0 to disable the JSONL traces and metrics file
+TRACING = os.getenv("TRACING", "1") != "0"
+# Counters that tools and the HTTP client can add to the current step;
+# result_bytes is the size of the tool result handed back to the model
+COUNTERS = ("prompt_tokens", "completion_tokens", "bytes", "pages", "cache_hits", "cache_misses",
+            "result_bytes")
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One traced step: a model call or a tool call."""
+
+    def __init__(self, kind: str, name: str, thread_id=None):
+        self.kind = kind
+        self.name = name
+        self.thread_id = None if thread_id is None else str(thread_id)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.error = None
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, **counters):
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + (value or 0)
+
+    def to_event(self, seconds: float) -> dict:
+        return {
+            "ts": self.started,
+            "thread_id": self.thread_id,
+            "kind": self.kind,
+            "name": self.name,
+            "seconds": round(seconds, 6),
+            "error": self.error,
+            **self.counters,
+        }
+
+
+class Tracer:
+    """Collects finished spans and hands them to its sinks.
+
+    Every event is appended to ``<trace_dir>/<thread_id>.jsonl`` and folded into
+    per-session and process-wide aggregates (see ``session_summary`` and
+    ``prometheus_text``). Extra exporters can be plugged in with ``add_sink``;
+    a sink is any callable taking the event dict.
+
+    Args:
+        trace_dir: Directory for the JSONL traces and ``metrics.prom``
+        enabled: Write traces to disk (aggregates are always kept)
+    """
+
+    def __init__(self, trace_dir=TRACE_DIR, enabled: bool = TRACING):
+        self.trace_dir = Path(trace_dir)
+        self.enabled = enabled
+        self.sinks = []
+        self.sessions = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    @staticmethod
+    def _fold(aggregates: dict, event: dict):
+        key = (event["kind"], event["name"])
+        agg = aggregates.setdefault(key, dict(dict.fromkeys(COUNTERS, 0), calls=0, errors=0, seconds=0.0))
+        agg["calls"] += 1
+        agg["errors"] += event["error"] is not None
+        agg["seconds"] += event["seconds"]
+        for counter in COUNTERS:
+            agg[counter] += event.get(counter, 0)
+
+    def emit(self, event: dict):
+        with self._lock:
+            self._fold(self.totals, event)
+            if event["thread_id"] is not None:
+                self._fold(self.sessions.setdefault(event["thread_id"], {}), event)
+            if self.enabled:
+                self.trace_dir.mkdir(parents=True, exist_ok=True)
+                name = re.sub(r"[^A-Za-z0-9_.-]", "_", event["thread_id"] or "no_thread")
+                with open(self.trace_dir / f"{name}.jsonl", "a") as f:
+                    f.write(json.dumps(event) + "\n")
+                tmp = self.trace_dir / "metrics.prom.tmp"
+                tmp.write_text(self._prometheus_text())
+                tmp.replace(self.trace_dir / "metrics.prom")
+        for sink in self.sinks:
+            sink(event)
+
+    def session_summary(self, thread_id) -> list[dict]:
+        """Aggregates of one session, one row per (kind, name), slowest first."""
+        with self._lock:
+            rows = [dict(agg, kind=kind, name=name)
+                    for (kind, name), agg in self.sessions.get(str(thread_id), {}).items()]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+    def _prometheus_text(self) -> str:
+        metrics = [
+            ("ai_researcher_step_calls_total", "counter", "Completed steps", "calls"),
+            ("ai_researcher_step_errors_total", "counter", "Steps that raised", "errors"),
+            ("ai_researcher_step_seconds_total", "counter", "Wall time spent in steps", "seconds"),
+        ] + [(f"ai_researcher_{c}_total", "counter", f"{c.replace('_', ' ').capitalize()} recorded by steps", c)
+             for c in COUNTERS]
+        lines = []
+        for metric, kind, help_text, field in metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for (step_kind, name), agg in sorted(self.totals.items()):
+                lines.append(f'{metric}{{kind="{step_kind}",name="{name}"}} {round(agg[field], 6)}')
+        return "\n".join(lines) + "\n"
+
+    def prometheus_text(self) -> str:
+        """Process-wide aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            return self._prometheus_text()
+
+
+tracer = Tracer()
+
+
+def add(**counters):
+    """Add to the counters of the step running in this context, if any."""
+    span = _current.get()
+    if span is not None:
+        span.add(**counters)
+
+
+def _thread_id():
+    from langgraph.config import get_config
+
+    try:
+        return get_config()["configurable"].get("thread_id")
+    except (RuntimeError, KeyError):
+        return None
+
+
+@contextmanager
+def span(kind: str, name: str, thread_id=None):
+    """Trace the enclosed block as one step; yields the ``Span``."""
+    current = Span(kind, name, _thread_id() if thread_id is None else thread_id)
+    token = _current.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        tracer.emit(current.to_event(time.perf_counter() - started))
+
+
+def record_usage(current: Span, response):
+    """Add the token counts of a chat model ``response`` to ``current``."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    current.add(prompt_tokens=usage.get("input_tokens"), completion_tokens=usage.get("output_tokens"))
+
+
+def _tool_error(result) -> str | None:
+    # Tool errors handled by the tool come back as ToolMessages with status "error"
+    return "ToolError" if getattr(result, "status", None) == "error" else None
+
+
+def _finish_tool(current: Span, result):
+    current.error = _tool_error(result)
+    content = getattr(result, "content", None)
+    if content is not None:
+        text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+        current.add(result_bytes=len(text.encode()))
+
+
+def wrap_tool_call(request, execute):
+    """``ToolNode(wrap_tool_call=...)`` hook tracing every tool call."""
+    with span("tool", request.tool_call["name"]) as current:
+        result = execute(request)
+        _finish_tool(current, result)
+        return result
+
+
+async def awrap_tool_call(request, execute):
+    """Async counterpart of ``wrap_tool_call``."""
+    with span("tool", request.tool_call["name"]) as current:
+        result = await execute(request)
+        _finish_tool(current, result)
+        return result
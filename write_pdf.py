@@ -1,9 +1,198 @@
 # Step1: Install tectonic & Import deps
-from langchain_core.tools import tool
+from langchain_core.tools import ToolException, tool
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from disk_cache import CACHE_DIR, DiskCache
+from latex_check import ERROR, LatexValidationError, format_issues, validate_latex
+from output_index import OUTPUT_DIR, output_index
+import tracing
+import asyncio
+import hashlib
+import os
+import re
 import subprocess
 import shutil
+import threading
+import time
+
+# Tectonic keeps downloaded bundle files here between runs (and restarts)
+TECTONIC_CACHE_DIR = Path(os.getenv("TECTONIC_CACHE_DIR", str(CACHE_DIR / "tectonic")))
+# Concurrent tectonic processes; further compiles wait for a free worker
+LATEX_WORKERS = int(os.getenv("LATEX_WORKERS", 2))
+LATEX_COMPILE_TIMEOUT = float(os.getenv("LATEX_COMPILE_TIMEOUT", 120))
+LATEX_CACHE_MAX_ENTRIES = int(os.getenv("LATEX_CACHE_MAX_ENTRIES", 200))
+# Lines of the tectonic log returned to the agent when a compile fails
+LATEX_ERROR_LINES = int(os.getenv("LATEX_ERROR_LINES", 15))
+LOG_ERROR_RE = re.compile(r"^(error|!)|^l\.\d+|\.tex:\d+:", re.IGNORECASE)
+
+# hash of (engine version, LaTeX source) -> path of the PDF it produced
+compile_cache = DiskCache("latex_builds.sqlite", max_entries=LATEX_CACHE_MAX_ENTRIES)
+# tectonic runs via subprocess.run in a thread pool rather than
+# asyncio.create_subprocess_exec: a concurrent.futures.Future can be shared by
+# the sync tool, which blocks on it, and by async callers on any event loop,
+# which await it with asyncio.wrap_future. An asyncio subprocess belongs to one
+# loop, and an asyncio.Semaphore cannot bound the processes across loops and
+# threads. The event loop is never blocked either way.
+_pool = ThreadPoolExecutor(max_workers=LATEX_WORKERS, thread_name_prefix="tectonic")
+# Identical documents submitted while one is compiling share its future
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class CompileMetrics:
+    """Compile durations and cache hit counters for ``render_latex_pdf``."""
+
+    def __init__(self, maxlen: int = 200):
+        self.recent = deque(maxlen=maxlen)
+        self.compiles = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    def record_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def record(self, seconds: float, ok: bool):
+        with self._lock:
+            self.compiles += 1
+            self.failures += not ok
+            self.recent.append(seconds)
+
+    def summary(self) -> dict:
+        with self._lock:
+            durations = sorted(self.recent)
+            return {
+                "compiles": self.compiles,
+                "failures": self.failures,
+                "cache_hits": self.cache_hits,
+                "mean_seconds": sum(durations) / len(durations) if durations else 0.0,
+                "p95_seconds": durations[int(0.95 * (len(durations) - 1))] if durations else 0.0,
+                "max_seconds": durations[-1] if durations else 0.0,
+            }
+
+
+metrics = CompileMetrics()
+
+
+class LatexCompileError(ToolException):
+    """tectonic failed; the message carries the relevant lines of its log."""
+
+
+def key_log_lines(log: str, limit: int = LATEX_ERROR_LINES) -> list[str]:
+    """Error lines (and TeX's ``l.<n>`` context lines) from a tectonic log.
+
+    Falls back to the last ``limit`` lines when nothing looks like an error.
+    """
+    lines = [line.rstrip() for line in log.splitlines() if line.strip()]
+    errors = [line for line in lines if LOG_ERROR_RE.search(line)]
+    return errors[:limit] if errors else lines[-limit:]
+
+
+@lru_cache(maxsize=1)
+def engine_version() -> str:
+    """``tectonic --version`` output; part of the compile cache key."""
+    if shutil.which("tectonic") is None:
+        raise RuntimeError(
+            "tectonic is not installed. Install it first on your system."
+        )
+    result = subprocess.run(["tectonic", "--version"], capture_output=True, text=True, timeout=30)
+    return result.stdout.strip()
+
+
+def _source_hash(latex_content: str) -> str:
+    digest = hashlib.sha256(engine_version().encode())
+    digest.update(b"\0")
+    digest.update(latex_content.encode())
+    return digest.hexdigest()
+
+
+def _cached_pdf(key: str) -> str | None:
+    path = compile_cache.get(key)
+    if path and Path(path).exists():
+        metrics.record_hit()
+        tracing.add(cache_hits=1)
+        print(f"Reusing compiled PDF at {path}")
+        return path
+    tracing.add(cache_misses=1)
+    return None
+
+
+def _current_session() -> str | None:
+    """Thread id of the graph run calling the tool, if any."""
+    from langgraph.config import get_config
+
+    try:
+        return get_config()["configurable"].get("thread_id")
+    except (RuntimeError, KeyError):
+        return None
+
+
+def _compile(key: str, latex_content: str, session: str | None = None, warnings=()) -> str:
+    # Step2: Create directory
+    output_dir = OUTPUT_DIR
+    output_dir.mkdir(parents=True, exist_ok=True)
+    TECTONIC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Step3: Setup filenames; the hash prefix keeps concurrent compiles apart
+    timestamp = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+    tex_filename = f"paper_{timestamp}_{key[:8]}.tex"
+    final_pdf = output_dir / f"paper_{timestamp}_{key[:8]}.pdf"
+    # Step4: Export as tex & pdf
+    (output_dir / tex_filename).write_text(latex_content)
+
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(
+            ["tectonic", tex_filename, "--outdir", str(output_dir)],
+            cwd=output_dir,
+            capture_output=True,
+            text=True,
+            timeout=LATEX_COMPILE_TIMEOUT,
+            env={**os.environ, "TECTONIC_CACHE_DIR": str(TECTONIC_CACHE_DIR)},
+        )
+    except subprocess.TimeoutExpired:
+        metrics.record(time.perf_counter() - started, ok=False)
+        raise LatexCompileError(f"tectonic timed out after {LATEX_COMPILE_TIMEOUT:.0f}s")
+    elapsed = time.perf_counter() - started
+    ok = result.returncode == 0 and final_pdf.exists()
+    metrics.record(elapsed, ok)
+    if not ok:
+        log = "\n".join(key_log_lines(result.stderr + "\n" + result.stdout))
+        if warnings:
+            log += "\nPossible causes found before compiling:\n" + format_issues(warnings)
+        raise LatexCompileError(
+            f"LaTeX compilation failed (tectonic exit code {result.returncode}):\n{log}"
+        )
+
+    compile_cache.set(key, str(final_pdf))
+    output_index.record(output_dir / tex_filename, session)
+    output_index.record(final_pdf, session)
+    print(f"Successfully generated PDF at {final_pdf} in {elapsed:.1f}s")
+    return str(final_pdf)
+
+
+def _submit(latex_content: str, session: str | None = None):
+    """Return the cached PDF path, or a future compiling ``latex_content``."""
+    # Structural mistakes are reported in milliseconds instead of after a
+    # failed tectonic run; warnings only accompany tectonic's own errors
+    issues = validate_latex(latex_content)
+    if any(issue["severity"] == ERROR for issue in issues):
+        raise LatexValidationError(issues)
+    key = _source_hash(latex_content)
+    cached = _cached_pdf(key)
+    if cached:
+        return cached
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _pool.submit(_compile, key, latex_content, session, issues)
+            _inflight[key] = future
+            future.add_done_callback(lambda _: _inflight.pop(key, None))
+    return future
+
 
 @tool
 def render_latex_pdf(latex_content: str) -> str:
@@ -15,37 +204,27 @@ def render_latex_pdf(latex_content: str) -> str:
     Returns:
         Path to the generated PDF document
     """
-    if shutil.which("tectonic") is None:
-        raise RuntimeError(
-            "tectonic is not installed. Install it first on your system."
-        )
-
     try:
-        # Step2: Create directory
-        output_dir = Path("output").absolute()
-        output_dir.mkdir(exist_ok=True)
-        # Step3: Setup filenames
-        timestamp = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-        tex_filename = f"paper_{timestamp}.tex"
-        pdf_filename = f"paper_{timestamp}.pdf"
-        # Step4: Export as tex & pdf
-        tex_file = output_dir / tex_filename
-        tex_file.write_text(latex_content)
+        job = _submit(latex_content, _current_session())
+        return job if isinstance(job, str) else job.result()
 
-        result = subprocess.run(
-                    ["tectonic", tex_filename, "--outdir", str(output_dir)],
-                    cwd=output_dir,
-                    capture_output=True,
-                    text=True,
-                )
+    except Exception as e:
+        print(f"Error rendering LaTeX: {str(e)}")
+        raise
 
-        final_pdf = output_dir / pdf_filename
-        if not final_pdf.exists():
-            raise FileNotFoundError("PDF file was not generated")
 
-        print(f"Successfully generated PDF at {final_pdf}")
-        return str(final_pdf)
+async def arender_latex_pdf(latex_content: str) -> str:
+    """Async render_latex_pdf: waits for the compile worker without blocking the loop."""
+    try:
+        job = _submit(latex_content, _current_session())
+        return job if isinstance(job, str) else await asyncio.wrap_future(job)
 
     except Exception as e:
         print(f"Error rendering LaTeX: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+render_latex_pdf.coroutine = arender_latex_pdf
+# Validation and compile errors go back to the agent as the tool result, so
+# it can fix the reported lines instead of retrying blind
+render_latex_pdf.handle_tool_error = True